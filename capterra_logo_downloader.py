@@ -1,5 +1,4 @@
 import os
-import csv
 import time
 import re
 import requests
@@ -15,6 +14,8 @@ from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 from tkinter import Tk, filedialog
 
+from product_csv import read_products
+
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
@@ -151,12 +152,10 @@ def main():
     wait = WebDriverWait(driver, 30)
 
     # Load CSV
-    with open(csv_path, encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
+    rows = list(read_products(csv_path))
 
     pending = {
-        normalize(r["Title"]): r for r in rows if r.get("Title")
+        normalize(r.title): r for r in rows if r.title
     }
 
     # Open directory
@@ -202,7 +201,7 @@ def main():
                 for key in list(pending.keys()):
                     if key in scraped or scraped in key:
                         save_path = os.path.join(
-                            save_dir, sanitize(pending[key]["Title"]) + ".png"
+                            save_dir, sanitize(pending[key].title) + ".png"
                         )
                         if download_image(img_url, save_path):
                             print(f"✅ Capterra LOGO: {pending[key]['Title']}")
@@ -223,9 +222,9 @@ def main():
 
     # Fallback (favicon)
     for key, row in pending.items():
-        domain = get_domain(row.get("product.metafields.custom.custom", ""))
+        domain = get_domain(row.url)
         if domain:
-            fetch_logo_or_favicon(domain, row["Title"], save_dir)
+            fetch_logo_or_favicon(domain, row.title, save_dir)
 
     driver.quit()
     print("\n🎉 DONE — LOGO → FAVICON FALLBACK COMPLETED")
@@ -1,5 +1,4 @@
 import os
-import csv
 import time
 import re
 import requests
@@ -12,6 +11,8 @@ from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 from tkinter import Tk, filedialog
 
+from product_csv import read_products
+
 
 # ---------------- HELPERS ----------------
 
@@ -88,9 +89,7 @@ def main():
     print(f"✅ Category found: {category_url}")
 
     # STEP 2: Load CSV titles
-    with open(csv_path, encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        csv_titles = [row.get("Title", "").strip() for row in reader]
+    csv_titles = [row.title for row in read_products(csv_path)]
 
     pending = {normalize(t): t for t in csv_titles}
 
@@ -1,5 +1,4 @@
 import os
-import csv
 import time
 import re
 import requests
@@ -17,6 +16,8 @@ from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 from tkinter import Tk, filedialog
 
+from product_csv import read_products
+
 # not count --------------------------
 
 # ========== FROM YOUR GUARANTEED FILE ==========
@@ -133,10 +134,9 @@ def main():
     os.makedirs(logos_dir, exist_ok=True)
 
     # Read CSV
-    with open(csv_path, encoding="utf-8") as f:
-        rows = list(csv.DictReader(f))
+    rows = list(read_products(csv_path))
 
-    pending = {normalize(r["Title"]): r for r in rows if r.get("Title")}
+    pending = {normalize(r.title): r for r in rows if r.title}
 
     category_name = os.path.basename(csv_path).replace(".csv", "").replace("-", " ").title()
 
@@ -182,10 +182,10 @@ def main():
 
                 for key in list(pending.keys()):
                     if key in scraped or scraped in key:
-                        title = pending[key]["Title"]
+                        title = pending[key].title
                         base_path = os.path.join(logos_dir, re.sub(r'[^a-zA-Z0-9\-]', '', title.replace(" ", "-").lower()))
                         if not download(img_url, base_path):
-                            domain = get_domain(pending[key].get("product.metafields.custom.custom", ""))
+                            domain = get_domain(pending[key].url)
                             if domain:
                                 fetch_logo_or_favicon(domain, title, logos_dir)
                         else:
@@ -203,9 +203,9 @@ def main():
 
     # Final favicon for leftovers
     for row in pending.values():
-        domain = get_domain(row.get("product.metafields.custom.custom", ""))
+        domain = get_domain(row.url)
         if domain:
-            fetch_logo_or_favicon(domain, row["Title"], logos_dir)
+            fetch_logo_or_favicon(domain, row.title, logos_dir)
 
     driver.quit()
     print("\n🎉 DONE — Capterra logo → Website logo → Favicon (GUARANTEED)")
@@ -1,5 +1,4 @@
 import os
-import csv
 import time
 import re
 import requests
@@ -17,6 +16,8 @@ from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 from tkinter import Tk, filedialog
 
+from product_csv import read_products
+
 
 # ================= COUNTS =================
 TOTAL = 0
@@ -150,11 +151,10 @@ def main():
     logos_dir = os.path.join(base_dir, "logos")
     os.makedirs(logos_dir, exist_ok=True)
 
-    with open(csv_path, encoding="utf-8") as f:
-        rows = list(csv.DictReader(f))
+    rows = list(read_products(csv_path))
 
     TOTAL = len(rows)
-    pending = {normalize(r["Title"]): r for r in rows if r.get("Title")}
+    pending = {normalize(r.title): r for r in rows if r.title}
 
     category_name = os.path.basename(csv_path).replace(".csv", "").replace("-", " ").title()
 
@@ -199,7 +199,7 @@ def main():
 
                 for key in list(pending.keys()):
                     if key in scraped or scraped in key:
-                        title = pending[key]["Title"]
+                        title = pending[key].title
                         base_path = os.path.join(
                             logos_dir,
                             re.sub(r'[^a-zA-Z0-9\-]', '', title.replace(" ", "-").lower())
@@ -209,7 +209,7 @@ def main():
                             print(f"✅ CAPTERRA LOGO: {title}")
                             CAPTERRA_LOGO += 1
                         else:
-                            domain = get_domain(pending[key].get("product.metafields.custom.custom", ""))
+                            domain = get_domain(pending[key].url)
                             if domain:
                                 fetch_logo_or_favicon(domain, title, logos_dir)
                             else:
@@ -229,9 +229,9 @@ def main():
             break
 
     for row in pending.values():
-        domain = get_domain(row.get("product.metafields.custom.custom", ""))
+        domain = get_domain(row.url)
         if domain:
-            fetch_logo_or_favicon(domain, row["Title"], logos_dir)
+            fetch_logo_or_favicon(domain, row.title, logos_dir)
         else:
             NOT_FOUND += 1
 
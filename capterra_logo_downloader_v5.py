@@ -1,28 +1,35 @@
+import startup
+
 import os
-import csv
 import time
 import re
 import requests
+from requests.adapters import HTTPAdapter
 from urllib.parse import urlparse, urljoin
-from bs4 import BeautifulSoup
-from PIL import Image
 import io
+import argparse
+from urllib.parse import quote_plus
+
+# selenium, webdriver_manager, bs4, PIL and tkinter are imported where they
+# are first needed, so runs that never open a browser start fast
 
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from tkinter import Tk, filedialog
+import capterra_planner
+import chrome_driver
+import capterra_network
+from product_csv import read_products
+from logo_manifest import ManifestWriter, image_info
+import logo_metrics
+import logo_trace
+import logo_profile
+import logo_cassette
+import output_names
+import logo_store
+import logo_sinks
+from logo_metrics import ROWS, INPUT_ROWS, HTTP_REQUESTS, STAGE_SECONDS
 
 
-# ================= COUNTS =================
-TOTAL = 0
-CAPTERRA_LOGO = 0
-FAVICON_LOGO = 0
-NOT_FOUND = 0
+# set in main() when --manifest is given
+MANIFEST = None
 
 
 HEADERS = {
@@ -30,6 +37,15 @@ HEADERS = {
 }
 
 SUPPORTED_FORMATS = [".png", ".jpg", ".jpeg", ".webp", ".svg", ".avif", ".ico"]
+# .ico downloads are saved as .png
+SAVED_FORMATS = [ext for ext in SUPPORTED_FORMATS if ext != ".ico"]
+
+SEARCH_URL = "{origin}/search/?query={query}"
+
+# One keep-alive pool shared by every download (and by logo_batch threads)
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=64, pool_maxsize=64))
+SESSION.mount("http://", HTTPAdapter(pool_connections=64, pool_maxsize=64))
 
 
 def get_domain(url):
@@ -49,19 +65,43 @@ def get_domain(url):
 
 def save_image(content, ext, base_path):
     if ext == ".ico":
-        img = Image.open(io.BytesIO(content))
-        img = img.convert("RGBA")
-        img.save(base_path + ".png", "PNG", quality=100)
-        return True
+        from PIL import Image
+        with logo_trace.span("decode"):
+            img = Image.open(io.BytesIO(content))
+            img = img.convert("RGBA")
+        with logo_trace.span("encode"):
+            out = io.BytesIO()
+            img.save(out, "PNG", quality=100)
+        with logo_trace.span("write"):
+            return logo_store.write(base_path + ".png", out.getvalue())
+
+    # the sink decides where the file really lands (--sink sharded)
+    with logo_trace.span("write"):
+        return logo_store.write(base_path + ext, content)
+
+
+def describe_image(content):
+    info = image_info(content)
+    try:
+        from PIL import Image
+        # only reads the header, no full decode
+        info["width"], info["height"] = Image.open(io.BytesIO(content)).size
+    except:
+        pass
+    return info
+
 
-    with open(base_path + ext, "wb") as f:
-        f.write(content)
-    return True
+def write_manifest(title, domain, source, info, start):
+    if MANIFEST:
+        MANIFEST.write(
+            title=title, domain=domain, source=source,
+            latency_ms=int((time.time() - start) * 1000), **(info or {})
+        )
 
 
-def download(url, base_path):
+def download(url, base_path, info=None):
     try:
-        r = requests.get(url, headers=HEADERS, timeout=20)
+        r = logo_metrics.timed_get(SESSION, url, headers=HEADERS, timeout=20)
         if r.status_code != 200 or not r.content:
             return False
 
@@ -69,24 +109,29 @@ def download(url, base_path):
         if ext not in SUPPORTED_FORMATS:
             ext = ".png"
 
-        save_image(r.content, ext, base_path)
+        with STAGE_SECONDS.time(stage="save"):
+            path = save_image(r.content, ext, base_path)
+        if info is not None:
+            info.update(describe_image(r.content), source_url=url, path=path)
         return True
     except:
         return False
 
 
 def fetch_logo_or_favicon(domain, title, logos_dir):
-    global FAVICON_LOGO, NOT_FOUND
-
     homepage = f"https://{domain}"
     safe_name = re.sub(r'[^a-zA-Z0-9\-]', '', title.replace(" ", "-").lower())
     base_path = os.path.join(logos_dir, safe_name)
+    start = time.time()
+    info = {}
 
     soup = None
     try:
-        r = requests.get(homepage, headers=HEADERS, timeout=20, allow_redirects=True)
+        r = logo_metrics.timed_get(SESSION, homepage, headers=HEADERS, timeout=20, allow_redirects=True)
         if r.status_code == 200:
-            soup = BeautifulSoup(r.text, "html.parser")
+            from bs4 import BeautifulSoup
+            with STAGE_SECONDS.time(stage="parse"), logo_trace.span("parse", url=homepage):
+                soup = BeautifulSoup(r.text, "html.parser")
     except:
         pass
 
@@ -94,33 +139,38 @@ def fetch_logo_or_favicon(domain, title, logos_dir):
         for sel in ["img[alt*='logo' i]", "img[class*='logo' i]", "img[id*='logo' i]"]:
             tag = soup.select_one(sel)
             if tag and tag.get("src"):
-                if download(urljoin(homepage, tag["src"]), base_path):
+                if download(urljoin(homepage, tag["src"]), base_path, info):
                     print(f"🟢 WEBSITE LOGO: {title}")
-                    FAVICON_LOGO += 1
+                    ROWS.inc(tier="favicon", source="html_logo")
+                    write_manifest(title, domain, "html_logo", info, start)
                     return True
 
     if soup:
         for link in soup.find_all("link"):
             rel = " ".join(link.get("rel", [])).lower()
             if "icon" in rel and link.get("href"):
-                if download(urljoin(homepage, link["href"]), base_path):
+                if download(urljoin(homepage, link["href"]), base_path, info):
                     print(f"🟡 FAVICON: {title}")
-                    FAVICON_LOGO += 1
+                    ROWS.inc(tier="favicon", source="html_icon")
+                    write_manifest(title, domain, "html_icon", info, start)
                     return True
 
-    if download(f"{homepage}/favicon.ico", base_path):
+    if download(f"{homepage}/favicon.ico", base_path, info):
         print(f"🟡 FAVICON: {title}")
-        FAVICON_LOGO += 1
+        ROWS.inc(tier="favicon", source="favicon_ico")
+        write_manifest(title, domain, "favicon_ico", info, start)
         return True
 
     google = f"https://www.google.com/s2/favicons?domain={domain}&sz=256"
-    if download(google, base_path):
+    if download(google, base_path, info):
         print(f"🟡 GOOGLE FAVICON: {title}")
-        FAVICON_LOGO += 1
+        ROWS.inc(tier="favicon", source="google")
+        write_manifest(title, domain, "google", info, start)
         return True
 
     print(f"❌ NO IMAGE: {title}")
-    NOT_FOUND += 1
+    ROWS.inc(tier="not_found", source="not_found")
+    write_manifest(title, domain, "not_found", None, start)
     return False
 
 
@@ -128,108 +178,371 @@ def normalize(t):
     return re.sub(r'\s+', ' ', re.sub(r'[^a-z0-9 ]', '', (t or '').lower())).strip()
 
 
-def scroll_page(driver):
-    for _ in range(6):
+def scroll_page(driver, times=6):
+    for _ in range(times):
         driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
         time.sleep(2)
 
 
-def main():
-    global TOTAL, CAPTERRA_LOGO, NOT_FOUND
+def safe_base_path(logos_dir, title):
+    return os.path.join(
+        logos_dir,
+        re.sub(r'[^a-zA-Z0-9\-]', '', title.replace(" ", "-").lower())
+    )
 
-    Tk().withdraw()
-    csv_path = filedialog.askopenfilename(filetypes=[("CSV Files", "*.csv")])
-    if not csv_path:
-        return
 
-    category_url = input("\n👉 Paste Capterra category URL: ").strip()
-    if not category_url.startswith("http"):
-        print("❌ Invalid category URL")
-        return
+def already_saved(logos_dir, title):
+    """Path of a valid logo for `title` left by an earlier run, or None.
+    The folder is listed once per process (output_names)."""
+    stem = os.path.basename(safe_base_path(logos_dir, title))
+    return output_names.for_folder(logos_dir).existing(stem, SAVED_FORMATS)
 
-    base_dir = os.path.dirname(csv_path)
-    logos_dir = os.path.join(base_dir, "logos")
-    os.makedirs(logos_dir, exist_ok=True)
 
-    with open(csv_path, encoding="utf-8") as f:
-        rows = list(csv.DictReader(f))
+def favicon_fallback(row, logos_dir, key=None):
+    """`key` is the trace row key; titles are unique within one CSV's
+    pending rows, so the title is used when none is given."""
+    domain = get_domain(row.url)
+    if domain:
+        with logo_trace.row(key or row.title, domain=domain):
+            return fetch_logo_or_favicon(domain, row.title, logos_dir)
+    ROWS.inc(tier="not_found", source="no_domain")
+    write_manifest(row.title, None, "no_domain", None, time.time())
+    return False
 
-    TOTAL = len(rows)
-    pending = {normalize(r["Title"]): r for r in rows if r.get("Title")}
+
+def save_capterra_logo(row, img_url, logos_dir, key=None):
+    """Returns "capterra", "favicon" or None depending on what was saved."""
+    title = row.title
+    start = time.time()
+    info = {}
+    with logo_trace.row(key or title, domain=get_domain(row.url)) as trace:
+        if img_url and download(img_url, safe_base_path(logos_dir, title), info):
+            print(f"✅ CAPTERRA LOGO: {title}")
+            ROWS.inc(tier="capterra", source="capterra")
+            write_manifest(title, trace["domain"], "capterra", info, start)
+            trace["tier"] = "capterra"
+        else:
+            trace["tier"] = "favicon" if favicon_fallback(row, logos_dir) else None
+    return trace["tier"]
+
+
+def make_driver(headless=False, driver_path=None, profile=None, profile_max_mb=None, capture=False):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.support.ui import WebDriverWait
 
     options = Options()
     options.add_argument("--start-maximized")
     options.add_argument("--disable-blink-features=AutomationControlled")
+    if headless:
+        options.add_argument("--headless=new")
+    if profile:
+        # keep Capterra's JS/CSS/fonts and cookies between runs
+        options.add_argument(f"--user-data-dir={profile}")
+        max_mb = profile_max_mb or chrome_driver.PROFILE_MAX_MB
+        options.add_argument(f"--disk-cache-size={max_mb * 1024 * 1024}")
+    if capture:
+        capterra_network.enable_capture(options)
 
     driver = webdriver.Chrome(
-        service=Service(ChromeDriverManager().install()),
+        service=Service(chrome_driver.resolve_driver(driver_path)),
         options=options
     )
-    wait = WebDriverWait(driver, 30)
+    return driver, WebDriverWait(driver, 30)
+
+
+def match_pending(pending, name):
+    """Take the pending row whose cleaned title equals the scraped name's.
+    (A substring match handed "Acme" the logo of "Acme Payroll".)"""
+    return pending.pop(normalize(name), None)
+
+
+def crawl_page(driver, wait, page_url, pending, capture=False):
+    """Load one listing page and take every matching row out of `pending`.
+    Returns ([(row, img_url), ...], next_page_url, total_pages).
+
+    With `capture` (driver made with capture=True) products are read from
+    the responses Chrome already received instead of per-card DOM calls.
+    The page is scrolled one step at a time only while that still brings
+    in new (lazy-loaded) products; the DOM walk is only the fallback."""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+
+    if capture:
+        driver.get_log("performance")  # drop events from earlier pages
+
+    driver.get(page_url)
+    wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+    known_pages = count_pages(driver)
+    matches = []
+
+    if capture:
+        products, next_url = capterra_network.harvest(driver, page_url)
+        if products:
+            seen = set(products)
+            for _ in range(6):
+                scroll_page(driver, 1)
+                more, more_next = capterra_network.harvest(driver, page_url)
+                more = [p for p in more if p not in seen]
+                next_url = next_url or more_next
+                if not more:
+                    break
+                seen.update(more)
+                products += more
+            for name, img_url in products:
+                row = match_pending(pending, name)
+                if row:
+                    matches.append((row, img_url))
+            return matches, next_url, known_pages
+
+    scroll_page(driver)
+    cards = driver.find_elements(By.CSS_SELECTOR, "div.card")
+
+    for card in cards:
+        try:
+            name_el = card.find_element(By.CSS_SELECTOR, "h2.h5 a")
+            img_el = card.find_element(By.TAG_NAME, "img")
 
-    page_url = category_url
+            img_url = img_el.get_attribute("src")
+            row = match_pending(pending, name_el.text)
+            if row:
+                matches.append((row, img_url))
+        except:
+            continue
+
+    try:
+        next_btn = driver.find_element(By.CSS_SELECTOR, "a[rel='next']")
+        next_url = next_btn.get_attribute("href")
+    except:
+        next_url = None
+
+    return matches, next_url, known_pages
+
+
+def count_pages(driver):
+    from selenium.webdriver.common.by import By
+
+    pages = 0
+    for a in driver.find_elements(By.CSS_SELECTOR, "ul.pagination a"):
+        text = (a.text or "").strip()
+        if text.isdigit():
+            pages = max(pages, int(text))
+    return pages or None
 
-    while page_url and pending:
-        driver.get(page_url)
-        wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-        scroll_page(driver)
-
-        cards = driver.find_elements(By.CSS_SELECTOR, "div.card")
-
-        for card in cards:
-            try:
-                name_el = card.find_element(By.CSS_SELECTOR, "h2.h5 a")
-                img_el = card.find_element(By.TAG_NAME, "img")
-
-                scraped = normalize(name_el.text)
-                img_url = img_el.get_attribute("src")
-
-                for key in list(pending.keys()):
-                    if key in scraped or scraped in key:
-                        title = pending[key]["Title"]
-                        base_path = os.path.join(
-                            logos_dir,
-                            re.sub(r'[^a-zA-Z0-9\-]', '', title.replace(" ", "-").lower())
-                        )
-
-                        if img_url and download(img_url, base_path):
-                            print(f"✅ CAPTERRA LOGO: {title}")
-                            CAPTERRA_LOGO += 1
-                        else:
-                            domain = get_domain(pending[key].get("product.metafields.custom.custom", ""))
-                            if domain:
-                                fetch_logo_or_favicon(domain, title, logos_dir)
-                            else:
-                                NOT_FOUND += 1
-
-                        del pending[key]
-                        break
-            except:
-                continue
 
+def lookup_product(driver, wait, category_url, title):
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+
+    parsed = urlparse(category_url)
+    origin = f"{parsed.scheme}://{parsed.netloc}"
+    driver.get(SEARCH_URL.format(origin=origin, query=quote_plus(title)))
+    wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+
+    key = normalize(title)
+    for card in driver.find_elements(By.CSS_SELECTOR, "div.card"):
         try:
-            next_btn = driver.find_element(By.CSS_SELECTOR, "a[rel='next']")
-            page_url = next_btn.get_attribute("href")
+            name_el = card.find_element(By.CSS_SELECTOR, "h2.h5 a")
+            img_el = card.find_element(By.TAG_NAME, "img")
+            scraped = normalize(name_el.text)
+            if scraped and (key in scraped or scraped in key):
+                return img_el.get_attribute("src")
         except:
+            continue
+    return None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Download Capterra logos for a Shopify CSV")
+    parser.add_argument("--csv", help="CSV file (opens a file picker when omitted)")
+    parser.add_argument("--category-url", help="Capterra category URL (prompted when omitted)")
+    parser.add_argument(
+        "--strategy", choices=["auto"] + capterra_planner.STRATEGIES, default="auto",
+        help="auto = let the planner pick per page from pending count and past hit rates"
+    )
+    parser.add_argument(
+        "--manifest",
+        help="write one record per row as it finishes (.jsonl, .csv or .parquet)"
+    )
+    parser.add_argument(
+        "--chromedriver",
+        help="use this chromedriver instead of resolving one (also $CHROMEDRIVER)"
+    )
+    parser.add_argument(
+        "--profile-dir", nargs="?", const=chrome_driver.PROFILE_DIR,
+        help="reuse a persistent Chrome profile (browser cache, cookies) across runs"
+    )
+    parser.add_argument(
+        "--profile-max-mb", type=int, default=chrome_driver.PROFILE_MAX_MB,
+        help="browser cache size cap for --profile-dir"
+    )
+    parser.add_argument(
+        "--network-capture", action="store_true",
+        help="read listing data from captured network responses instead of walking the DOM"
+    )
+    parser.add_argument(
+        "--startup-report", action="store_true",
+        help="print time to first row and which heavy modules got imported"
+    )
+    parser.add_argument(
+        "--skip-existing", action="store_true",
+        help="skip rows whose logo is already a valid image in the logos folder"
+    )
+    logo_metrics.add_arguments(parser)
+    logo_trace.add_arguments(parser)
+    logo_profile.add_arguments(parser)
+    logo_cassette.add_arguments(parser)
+    logo_store.add_arguments(parser)
+    logo_sinks.add_arguments(parser)
+    return parser.parse_args()
+
+
+def main():
+    global MANIFEST
+
+    args = parse_args()
+
+    csv_path = args.csv
+    if not csv_path:
+        from tkinter import Tk, filedialog
+        Tk().withdraw()
+        csv_path = filedialog.askopenfilename(filetypes=[("CSV Files", "*.csv")])
+    if not csv_path:
+        return
+
+    category_url = args.category_url or input("\n👉 Paste Capterra category URL: ").strip()
+    if not category_url.startswith("http"):
+        print("❌ Invalid category URL")
+        return
+
+    base_dir = os.path.dirname(csv_path)
+    logos_dir = os.path.join(base_dir, "logos")
+    os.makedirs(logos_dir, exist_ok=True)
+
+    # only titled rows are kept, as projected (title, url, category) tuples
+    pending = {}
+    for row in read_products(csv_path):
+        INPUT_ROWS.inc()
+        if not row.title:
+            continue
+        if args.skip_existing and already_saved(logos_dir, row.title):
+            ROWS.inc(tier="existing", source="on_disk")
+            continue
+        pending[normalize(row.title)] = row
+
+    logo_metrics.start_export(args)
+    if args.trace:
+        logo_trace.enable(args.trace)
+    if args.profile:
+        logo_profile.enable(args.profile)
+    logo_cassette.start(args, [SESSION])
+    logo_sinks.start(args)
+    if args.dedup:
+        logo_store.enable(args.dedup)
+    history = capterra_planner.load_history()
+    if args.manifest:
+        MANIFEST = ManifestWriter(args.manifest)
+
+    def choose(page_no, known_pages):
+        if args.strategy != "auto":
+            return args.strategy
+        left = capterra_planner.pages_left(history, category_url, page_no, len(pending), known_pages)
+        return capterra_planner.plan(len(pending), left, history)
+
+    strategy = choose(0, None)
+    print(f"🧭 Strategy: {strategy} ({len(pending)} pending)")
+    if args.startup_report:
+        startup.report("Ready")
+
+    driver = None
+    if strategy != capterra_planner.FAVICON:
+        profile = None
+        if args.profile_dir:
+            profile = chrome_driver.profile_slot(args.profile_dir, 0, args.profile_max_mb)
+        driver, wait = make_driver(False, args.chromedriver, profile, args.profile_max_mb,
+                                   args.network_capture)
+
+    # ---------- CRAWL CATEGORY PAGES ----------
+    crawl_start = len(pending)
+    crawl_hits = 0
+    crawled = False
+    known_pages = None
+    page_no = 0
+    page_url = category_url
+
+    while strategy == capterra_planner.CRAWL and page_url and pending:
+        crawled = True
+        with STAGE_SECONDS.time(stage="crawl_page"), logo_profile.stage("crawl_page"):
+            matches, page_url, pages = crawl_page(driver, wait, page_url, pending, args.network_capture)
+        page_no += 1
+        known_pages = known_pages or pages
+
+        for row, img_url in matches:
+            crawl_hits += 1
+            with logo_profile.stage("save"):
+                save_capterra_logo(row, img_url, logos_dir)
+
+        if not page_url:
             break
 
+        strategy = choose(page_no, known_pages)
+        if strategy != capterra_planner.CRAWL:
+            print(f"🧭 Switching to {strategy} after page {page_no} ({len(pending)} pending)")
+
+    if crawled and not page_url:
+        history["pages"][category_url] = page_no
+        capterra_planner.update_rate(history, "crawl_hit_rate", crawl_hits, crawl_start)
+
+    # ---------- PER-PRODUCT LOOKUP ----------
+    if strategy == capterra_planner.LOOKUP and pending:
+        lookups = lookup_hits = 0
+        for key in list(pending.keys()):
+            row = pending.pop(key)
+            with STAGE_SECONDS.time(stage="lookup"), logo_profile.stage("lookup"):
+                img_url = lookup_product(driver, wait, category_url, row.title)
+            lookups += 1
+            if img_url:
+                lookup_hits += 1
+            save_capterra_logo(row, img_url, logos_dir)
+        capterra_planner.update_rate(history, "lookup_hit_rate", lookup_hits, lookups)
+
+    # ---------- FAVICON CASCADE ----------
+    before = HTTP_REQUESTS.value()
+    fallback_rows = len(pending)
     for row in pending.values():
-        domain = get_domain(row.get("product.metafields.custom.custom", ""))
-        if domain:
-            fetch_logo_or_favicon(domain, row["Title"], logos_dir)
-        else:
-            NOT_FOUND += 1
-
-    driver.quit()
+        with logo_profile.stage("favicon"):
+            favicon_fallback(row, logos_dir)
+    if fallback_rows:
+        history["favicon_requests"] = round(
+            (1 - capterra_planner.ALPHA) * history["favicon_requests"]
+            + capterra_planner.ALPHA * (HTTP_REQUESTS.value() - before) / fallback_rows, 4
+        )
+
+    if driver:
+        driver.quit()
+    capterra_planner.save_history(history)
+    logo_sinks.finish()
+    if MANIFEST:
+        MANIFEST.close()
 
     print("\n" + "=" * 50)
     print("📊 FINAL SUMMARY")
     print("=" * 50)
-    print(f"🔢 Total softwares      : {TOTAL}")
-    print(f"🟢 Capterra logos       : {CAPTERRA_LOGO}")
-    print(f"🟡 Website/Favicon used : {FAVICON_LOGO}")
-    print(f"🔴 Not found            : {NOT_FOUND}")
+    print(f"🔢 Total softwares      : {INPUT_ROWS.value()}")
+    print(f"🟢 Capterra logos       : {ROWS.value(tier='capterra')}")
+    print(f"🟡 Website/Favicon used : {ROWS.value(tier='favicon')}")
+    print(f"🔴 Not found            : {ROWS.value(tier='not_found')}")
+    if args.skip_existing:
+        print(f"⏭️  Already on disk      : {ROWS.value(tier='existing')}")
+    print(f"🌐 HTTP requests        : {HTTP_REQUESTS.value()}")
+    print(f"📦 Downloaded           : {logo_metrics.BYTES.value() // 1024} KB")
+    if logo_store.summary():
+        print(f"♻️  Dedup                : {logo_store.summary()}")
     print("=" * 50)
+    logo_metrics.finish_export(args)
+    if args.startup_report:
+        startup.report("Finished")
 
 
 if __name__ == "__main__":
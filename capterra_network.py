@@ -0,0 +1,132 @@
+import json
+from urllib.parse import urljoin, urlparse
+
+
+# Keys that carry a product name / logo URL in Capterra's JSON payloads
+NAME_KEYS = ("name", "productName", "product_name", "title")
+IMAGE_KEYS = ("logo", "logoUrl", "logo_url", "image", "imageUrl", "image_url", "thumbnail")
+# Keys that identify an untyped list entry as a product
+PRODUCT_KEYS = ("id", "productId", "product_id", "slug", "url", "productUrl", "product_url")
+
+# JSON-LD types a listed product can carry
+PRODUCT_TYPES = ("Product", "SoftwareApplication", "WebApplication", "MobileApplication")
+
+TEXT_TYPES = ("json", "html", "javascript")
+
+
+def enable_capture(options):
+    """Ask chromedriver to keep DevTools network events in the
+    "performance" log."""
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+def captured_responses(driver, host):
+    """(request_id, url, mime_type) for every text response from `host`
+    since the log was last read."""
+    responses = []
+    for entry in driver.get_log("performance"):
+        try:
+            message = json.loads(entry["message"])["message"]
+        except:
+            continue
+        if message.get("method") != "Network.responseReceived":
+            continue
+
+        params = message["params"]
+        response = params.get("response", {})
+        url = response.get("url", "")
+        mime = response.get("mimeType", "")
+        if urlparse(url).netloc.endswith(host) and any(t in mime for t in TEXT_TYPES):
+            responses.append((params["requestId"], url, mime))
+    return responses
+
+
+def response_body(driver, request_id):
+    try:
+        body = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+        return body.get("body", "")
+    except:
+        return ""
+
+
+def products_from_json(data, base_url, found, listed=False):
+    """Walk any JSON shape and collect (name, image_url) pairs from the
+    entries of product lists: objects held directly by a list (or by a
+    JSON-LD ListItem) that carry a product type or a product id/URL/slug.
+    Objects nested inside an entry (reviewers, vendors, badges) and the
+    site's own Organization are skipped."""
+    if isinstance(data, dict):
+        kind = data.get("@type")
+        is_product = kind in PRODUCT_TYPES or (kind is None and any(data.get(k) for k in PRODUCT_KEYS))
+        if listed and is_product:
+            name = next((data[k] for k in NAME_KEYS if isinstance(data.get(k), str)), None)
+            image = next((data[k] for k in IMAGE_KEYS if isinstance(data.get(k), (str, dict))), None)
+            if isinstance(image, dict):
+                image = image.get("url") or image.get("src")
+            if name and isinstance(image, str) and image:
+                found.append((name, urljoin(base_url, image)))
+        for key, value in data.items():
+            products_from_json(value, base_url, found, kind == "ListItem" and key == "item")
+    elif isinstance(data, list):
+        for value in data:
+            products_from_json(value, base_url, found, True)
+    return found
+
+
+def products_from_html(html, base_url):
+    """Listing cards and JSON-LD from the server-rendered page, plus the
+    next-page link. Lazy images are read from data-src before src."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    found = []
+
+    for card in soup.select("div.card"):
+        name_el = card.select_one("h2.h5 a")
+        img_el = card.find("img")
+        if name_el and img_el:
+            src = img_el.get("data-src") or img_el.get("src")
+            if src and not src.startswith("data:"):
+                found.append((name_el.get_text(strip=True), urljoin(base_url, src)))
+
+    for script in soup.find_all("script", type="application/ld+json"):
+        try:
+            products_from_json(json.loads(script.string or ""), base_url, found)
+        except:
+            continue
+
+    next_el = soup.select_one("a[rel='next']")
+    next_url = urljoin(base_url, next_el["href"]) if next_el and next_el.get("href") else None
+    return found, next_url
+
+
+def harvest(driver, page_url):
+    """Products and next-page URL from the responses the browser received
+    while loading `page_url`. Returns ([], None) if nothing usable came in."""
+    host = urlparse(page_url).netloc
+    products = []
+    next_url = None
+    seen = set()
+
+    for request_id, url, mime in captured_responses(driver, host):
+        body = response_body(driver, request_id)
+        if not body:
+            continue
+
+        if "json" in mime:
+            try:
+                batch = products_from_json(json.loads(body), url, [])
+            except:
+                continue
+        elif "html" in mime:
+            batch, page_next = products_from_html(body, url)
+            next_url = next_url or page_next
+        else:
+            continue
+
+        for name, image in batch:
+            if (name, image) not in seen:
+                seen.add((name, image))
+                products.append((name, image))
+
+    return products, next_url
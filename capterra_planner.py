@@ -0,0 +1,92 @@
+import os
+import json
+import math
+
+
+# ================= STRATEGIES =================
+CRAWL = "crawl"        # keep paging through the category listing
+LOOKUP = "lookup"      # search Capterra once per remaining product
+FAVICON = "favicon"    # skip Capterra, go straight to the favicon cascade
+
+STRATEGIES = [CRAWL, LOOKUP, FAVICON]
+
+
+STATE_DIR = os.path.join(os.path.expanduser("~"), ".logo_extractor")
+PLANNER_FILE = os.path.join(STATE_DIR, "planner.json")
+
+# A browser page load pulls in far more than one HTTP request,
+# so it is weighted against plain `requests.get` calls.
+PAGE_WEIGHT = 5.0
+
+# Cost (in requests) of ending a row without a Capterra logo.
+# Without it "favicon" would always look cheapest.
+MISS_PENALTY = 10.0
+
+# Moving-average weight of the latest run in the history.
+ALPHA = 0.3
+
+DEFAULT_HISTORY = {
+    "cards_per_page": 25,
+    "crawl_hit_rate": 0.8,
+    "lookup_hit_rate": 0.6,
+    "favicon_requests": 3.0,
+    "pages": {},
+}
+
+
+def load_history(path=PLANNER_FILE):
+    history = dict(DEFAULT_HISTORY, pages={})
+    try:
+        with open(path, encoding="utf-8") as f:
+            history.update(json.load(f))
+    except:
+        pass
+    return history
+
+
+def save_history(history, path=PLANNER_FILE):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(history, f, indent=2)
+        os.replace(tmp, path)
+    except:
+        pass
+
+
+def update_rate(history, key, hits, attempts):
+    if attempts <= 0:
+        return
+    rate = hits / attempts
+    history[key] = round((1 - ALPHA) * history[key] + ALPHA * rate, 4)
+
+
+def pages_left(history, category_url, page_no, pending_count, known_pages=None):
+    total = known_pages or history["pages"].get(category_url)
+    if total:
+        return max(0, total - page_no)
+    return max(1, math.ceil(pending_count / history["cards_per_page"]))
+
+
+def estimate_costs(pending_count, remaining_pages, history):
+    fav = history["favicon_requests"]
+    crawl_hit = history["crawl_hit_rate"]
+    lookup_hit = history["lookup_hit_rate"]
+
+    def rows_cost(hit):
+        # one logo download per hit, full cascade + penalty per miss
+        return pending_count * (hit + (1 - hit) * (fav + MISS_PENALTY))
+
+    return {
+        CRAWL: remaining_pages * PAGE_WEIGHT + rows_cost(crawl_hit),
+        LOOKUP: pending_count * PAGE_WEIGHT + rows_cost(lookup_hit),
+        FAVICON: rows_cost(0.0),
+    }
+
+
+def plan(pending_count, remaining_pages, history):
+    if pending_count <= 0:
+        return FAVICON
+    costs = estimate_costs(pending_count, remaining_pages, history)
+    return min(STRATEGIES, key=lambda s: costs[s])
@@ -0,0 +1,189 @@
+import os
+import re
+import sys
+import json
+import shutil
+import subprocess
+import threading
+import time
+
+
+STATE_DIR = os.path.join(os.path.expanduser("~"), ".logo_extractor")
+DRIVER_CACHE = os.path.join(STATE_DIR, "chromedriver.json")
+
+# Explicit driver path, e.g. on air-gapped build boxes
+DRIVER_ENV = "CHROMEDRIVER"
+
+# resolved once per process: explicit path -> driver path
+RESOLVED = {}
+RESOLVED_LOCK = threading.Lock()
+
+# Persistent browser profiles (HTTP cache, cookies) live here, one per slot
+PROFILE_DIR = os.path.join(STATE_DIR, "chrome-profile")
+PROFILE_MAX_MB = 500
+PRUNE_INTERVAL = 24 * 3600
+
+# Only these are pruned; cookies and settings are left alone
+CACHE_SUBDIRS = [
+    os.path.join("Default", "Cache"),
+    os.path.join("Default", "Code Cache"),
+    os.path.join("Default", "Service Worker", "CacheStorage"),
+    "GrShaderCache",
+    "ShaderCache",
+]
+
+CHROME_BINARIES = [
+    "google-chrome", "google-chrome-stable", "chromium", "chromium-browser",
+    "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+]
+
+
+def chrome_version():
+    """Installed Chrome version without touching the network, or None."""
+    if sys.platform == "win32":
+        try:
+            import winreg
+            for root in (winreg.HKEY_CURRENT_USER, winreg.HKEY_LOCAL_MACHINE):
+                try:
+                    with winreg.OpenKey(root, r"Software\Google\Chrome\BLBeacon") as key:
+                        return winreg.QueryValueEx(key, "version")[0]
+                except OSError:
+                    continue
+        except:
+            pass
+        return None
+
+    for binary in CHROME_BINARIES:
+        path = binary if os.path.isabs(binary) else shutil.which(binary)
+        if not path or not os.path.exists(path):
+            continue
+        try:
+            out = subprocess.run([path, "--version"], capture_output=True, text=True, timeout=10).stdout
+            match = re.search(r"(\d+\.\d+\.\d+\.\d+)", out)
+            if match:
+                return match.group(1)
+        except:
+            continue
+    return None
+
+
+def load_cache():
+    try:
+        with open(DRIVER_CACHE, encoding="utf-8") as f:
+            return json.load(f)
+    except:
+        return {}
+
+
+def save_cache(cache):
+    try:
+        os.makedirs(STATE_DIR, exist_ok=True)
+        with open(DRIVER_CACHE, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=2)
+    except:
+        pass
+
+
+def resolve_driver(explicit_path=None):
+    """Path to a chromedriver matching the installed Chrome.
+
+    Order: explicit path / $CHROMEDRIVER, then the path cached for this
+    Chrome version (no network), then ChromeDriverManager (network) whose
+    result is cached. Offline, a cached driver for the same Chrome major
+    version is used; with none, RuntimeError says what to do.
+    """
+    explicit_path = explicit_path or os.environ.get(DRIVER_ENV)
+    # browser slots start in parallel; resolve (and download) once
+    with RESOLVED_LOCK:
+        if explicit_path not in RESOLVED:
+            RESOLVED[explicit_path] = _resolve(explicit_path)
+        return RESOLVED[explicit_path]
+
+
+def _resolve(explicit_path):
+    if explicit_path:
+        if os.path.exists(explicit_path):
+            return explicit_path
+        print(f"⚠️ chromedriver not found at {explicit_path}")
+
+    cache = load_cache()
+    version = chrome_version()
+    if version and os.path.exists(cache.get(version, "")):
+        return cache[version]
+
+    try:
+        from webdriver_manager.chrome import ChromeDriverManager
+        path = ChromeDriverManager().install()
+        if version:
+            cache[version] = path
+            save_cache(cache)
+        return path
+    except Exception as e:
+        print(f"⚠️ chromedriver download failed ({e}), trying cached drivers")
+        error = e
+
+    # chromedriver works with any Chrome of its own major version
+    major = version.split(".")[0] if version else None
+    for cached_version, path in reversed(list(cache.items())):
+        if major and cached_version.split(".")[0] == major and os.path.exists(path):
+            print(f"⚠️ Using cached chromedriver for Chrome {cached_version}")
+            return path
+
+    raise RuntimeError(
+        f"No chromedriver for Chrome {version or '(version unknown)'}: download failed ({error}) "
+        f"and none is cached. Pass --chromedriver or set ${DRIVER_ENV}."
+    )
+
+
+# ================= PERSISTENT PROFILE =================
+def _cache_files(profile):
+    for sub in CACHE_SUBDIRS:
+        for root, _, files in os.walk(os.path.join(profile, sub)):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield st.st_atime, st.st_size, path
+
+
+def prune_profile(profile, max_mb=PROFILE_MAX_MB):
+    """Delete least recently used cache files until the cache is under 80%
+    of `max_mb`. Runs at most once per PRUNE_INTERVAL per profile."""
+    marker = os.path.join(profile, ".last_prune")
+    try:
+        if time.time() - os.path.getmtime(marker) < PRUNE_INTERVAL:
+            return 0
+    except OSError:
+        pass
+
+    files = sorted(_cache_files(profile))
+    total = sum(size for _, size, _ in files)
+    target = max_mb * 1024 * 1024 * 0.8
+    freed = 0
+
+    for _, size, path in files:
+        if total - freed <= target:
+            break
+        try:
+            os.remove(path)
+            freed += size
+        except OSError:
+            pass
+
+    os.makedirs(profile, exist_ok=True)
+    with open(marker, "w") as f:
+        f.write(str(time.time()))
+    if freed:
+        print(f"🧹 Pruned {freed // (1024 * 1024)} MB from {profile}")
+    return freed
+
+
+def profile_slot(base=PROFILE_DIR, slot=0, max_mb=PROFILE_MAX_MB):
+    """A user-data dir per browser slot (Chrome allows one process per
+    profile), pruned before use."""
+    profile = os.path.join(base, f"slot-{slot}")
+    os.makedirs(profile, exist_ok=True)
+    prune_profile(profile, max_mb)
+    return profile
@@ -1,11 +1,12 @@
 import os
-import csv
 import requests
 from urllib.parse import urlparse
 from PIL import Image
 import io
 import re  # रेगुलर एक्सप्रेशन के लिए
 
+from product_csv import read_products
+
 def get_domain(url):
     if not url:
         return None
@@ -85,27 +86,20 @@ print(f"इमेजेस यहाँ सेव होंगी: {logos_dir}")
 success_count = 0
 fail_count = 0
 
-with open(csv_file_path, 'r', encoding='utf-8', newline='') as csvfile:
-    reader = csv.DictReader(csvfile)
+for title, url, category in read_products(csv_file_path, defaults=('', '', 'Unknown')):
+    domain = get_domain(url)
     
-    for row in reader:
-        url = row.get('product.metafields.custom.custom', '').strip()
-        title = row.get('Title', '').strip()
-        category = row.get('Product Category', 'Unknown').strip()
-        
-        domain = get_domain(url)
-        
-        if not domain:
-            print(f"Invalid URL skipped: {url}")
-            continue
-            
-        print(f"\nProcessing: {domain} → {title}")
+    if not domain:
+        print(f"Invalid URL skipped: {url}")
+        continue
         
-        # 🔧 CHANGE 3: output_dir की जगह logos_dir
-        if download_high_quality_png(domain, title, category, logos_dir):
-            success_count += 1
-        else:
-            fail_count += 1
+    print(f"\nProcessing: {domain} → {title}")
+    
+    # 🔧 CHANGE 3: output_dir की जगह logos_dir
+    if download_high_quality_png(domain, title, category, logos_dir):
+        success_count += 1
+    else:
+        fail_count += 1
 
 print("\n" + "="*70)
 print(f"समाप्त! कुल domains प्रोसेस: {success_count + fail_count}")
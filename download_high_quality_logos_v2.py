@@ -1,11 +1,38 @@
+import startup
+
 import os
-import csv
 import requests
+from requests.adapters import HTTPAdapter
 from urllib.parse import urlparse
-from PIL import Image
 import io
 import re
-from tkinter import Tk, filedialog  # ✅ FILE PICKER
+import time
+import argparse
+# PIL and tkinter are imported where they are first needed
+
+from source_stats import SourceStats
+import logo_sources
+from product_csv import read_products
+import logo_metrics
+import logo_trace
+import logo_profile
+import logo_cassette
+import output_names
+import logo_store
+import logo_sinks
+from logo_metrics import ROWS
+
+# Keep-alive pool shared by every API call (and by logo_service)
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=64))
+
+# Default API order; SourceStats may reorder or skip per domain.
+API_SOURCES = {
+    "duckduckgo": "https://icons.duckduckgo.com/ip3/{domain}.ico",
+    "faviconkit": "https://api.faviconkit.com/{domain}/256",
+    "google": "https://s2.googleusercontent.com/s2/favicons?domain={domain}&sz=256",
+    "clearbit": "https://logo.clearbit.com/{domain}?size=256",
+}
 
 def get_domain(url):
     if not url:
@@ -21,105 +48,201 @@ def get_domain(url):
     except:
         return None
 
-def download_high_quality_png(domain, product_title, category, output_dir):
-    if not domain:
+def save_high_quality_png(content, path):
+    try:
+        from PIL import Image
+        with logo_trace.span("decode"):
+            img = Image.open(io.BytesIO(content))
+
+            if img.format == 'ICO':
+                img = img.resize((256, 256), Image.LANCZOS)
+
+            img = img.convert("RGBA")
+        with logo_trace.span("encode"):
+            out = io.BytesIO()
+            img.save(out, "PNG", quality=100, optimize=False)
+        # where the file really landed (--sink sharded puts it in a subfolder)
+        with logo_trace.span("write"):
+            return logo_store.write(path, out.getvalue())
+    except:
         return False
-    
+
+def filename_base(domain, product_title, category):
     if product_title:
         clean_title = product_title.lower().strip().replace(" ", "-")
-        filename_base = f"{clean_title}-{category.replace(' ', '-')}"
-    else:
-        filename_base = domain.replace(".", "-")
+        return f"{clean_title}-{category.replace(' ', '-')}"
+    return domain.replace(".", "-")
+
+def download_high_quality_png(domain, product_title, category, output_dir, stats=None, index=None):
+    if not domain:
+        return False
     
-    filename = f"{filename_base}.png"
+    filename = f"{filename_base(domain, product_title, category)}.png"
     path = os.path.join(output_dir, filename)
 
-    api_list = [
-        f"https://icons.duckduckgo.com/ip3/{domain}.ico",
-        f"https://api.faviconkit.com/{domain}/256",
-        f"https://s2.googleusercontent.com/s2/favicons?domain={domain}&sz=256",
-        f"https://logo.clearbit.com/{domain}?size=256"
-    ]
+    sources = list(API_SOURCES)
+    if stats:
+        sources = stats.order(domain, sources)
 
-    for api_url in api_list:
+    for source in sources:
+        api_url = API_SOURCES[source].format(domain=domain)
+        start = time.time()
         try:
             print(f"  ट्राय कर रहा: {api_url.split('//')[1].split('/')[0]}")
-            response = requests.get(api_url, timeout=10)
-            if response.status_code == 200:
-                img_data = io.BytesIO(response.content)
-                img = Image.open(img_data)
-                
-                if img.format == 'ICO':
-                    img = img.resize((256, 256), Image.LANCZOS)
-                
-                img = img.convert("RGBA")
-                img.save(path, "PNG", quality=100, optimize=False)
-                print(f"✓ सेव हो गया: {filename}")
+            with logo_trace.span(source, "source"), logo_profile.stage(source):
+                response = logo_metrics.timed_get(SESSION, api_url, timeout=10)
+                saved = response.status_code == 200 and save_high_quality_png(response.content, path)
+            if saved:
+                print(f"✓ सेव हो गया: {os.path.relpath(saved, output_dir)}")
+                ROWS.inc(tier="favicon", source=source)
+                if index:
+                    index.record(path, api_url, response.headers, response.content)
+                if stats:
+                    stats.record(domain, source, True, time.time() - start)
                 return True
                 
         except Exception as e:
             print(f"  फेल: {api_url.split('//')[1].split('/')[0]} → {str(e)}")
 
+        if stats:
+            stats.record(domain, source, False, time.time() - start)
+
     print(f"✗ नहीं मिला: {domain} ({product_title})")
+    ROWS.inc(tier="not_found", source="not_found")
     return False
 
 
-# ================= MAIN PROGRAM =================
-
-# ✅ CSV FILE PICKER
-Tk().withdraw()  # tkinter window hide
-
-csv_file_path = filedialog.askopenfilename(
-    title="CSV फाइल चुनो",
-    filetypes=[("CSV Files", "*.csv")]
-)
-
-if not csv_file_path:
-    print("कोई CSV फाइल सेलेक्ट नहीं की गई")
-    exit()
-
-if not os.path.exists(csv_file_path):
-    print("फाइल नहीं मिली!")
-    exit()
-
-print(f"सेलेक्ट की गई CSV फाइल: {csv_file_path}")
-
-# CSV वाले folder का path
-base_dir = os.path.dirname(csv_file_path)
-
-# उसी folder में 'logos' नाम का folder
-logos_dir = os.path.join(base_dir, "logos")
-os.makedirs(logos_dir, exist_ok=True)
-
-print(f"इमेजेस यहाँ सेव होंगी: {logos_dir}")
+def parse_args():
+    parser = argparse.ArgumentParser(description="High quality PNG logos from favicon APIs")
+    parser.add_argument("--csv", help="CSV फाइल (न देने पर file picker खुलेगा)")
+    parser.add_argument(
+        "--freeze-order", action="store_true",
+        help="API हमेशा fixed order में ट्राय करो (reproducible runs)"
+    )
+    parser.add_argument(
+        "--refresh", action="store_true",
+        help="पुरानी logos को उनके source URL से revalidate करो, सिर्फ बदली हुई दोबारा डाउनलोड"
+    )
+    parser.add_argument(
+        "--startup-report", action="store_true",
+        help="पहली row तक का समय और कौन से heavy modules load हुए"
+    )
+    parser.add_argument(
+        "--skip-existing", action="store_true",
+        help="जिनकी valid PNG logos folder में पहले से है, वो rows छोड़ दो"
+    )
+    logo_metrics.add_arguments(parser)
+    logo_trace.add_arguments(parser)
+    logo_profile.add_arguments(parser)
+    logo_cassette.add_arguments(parser)
+    logo_store.add_arguments(parser)
+    logo_sinks.add_arguments(parser)
+    return parser.parse_args()
 
-success_count = 0
-fail_count = 0
 
-with open(csv_file_path, 'r', encoding='utf-8', newline='') as csvfile:
-    reader = csv.DictReader(csvfile)
-    
-    for row in reader:
-        url = row.get('product.metafields.custom.custom', '').strip()
-        title = row.get('Title', '').strip()
-        category = row.get('Product Category', 'Unknown').strip()
-        
+# ================= MAIN PROGRAM =================
+def main():
+    args = parse_args()
+
+    csv_file_path = args.csv
+    if not csv_file_path:
+        # ✅ CSV FILE PICKER
+        from tkinter import Tk, filedialog
+        Tk().withdraw()  # tkinter window hide
+
+        csv_file_path = filedialog.askopenfilename(
+            title="CSV फाइल चुनो",
+            filetypes=[("CSV Files", "*.csv")]
+        )
+
+    if not csv_file_path:
+        print("कोई CSV फाइल सेलेक्ट नहीं की गई")
+        return
+
+    if not os.path.exists(csv_file_path):
+        print("फाइल नहीं मिली!")
+        return
+
+    print(f"सेलेक्ट की गई CSV फाइल: {csv_file_path}")
+
+    # CSV वाले folder का path
+    base_dir = os.path.dirname(csv_file_path)
+
+    # उसी folder में 'logos' नाम का folder
+    logos_dir = os.path.join(base_dir, "logos")
+    os.makedirs(logos_dir, exist_ok=True)
+
+    print(f"इमेजेस यहाँ सेव होंगी: {logos_dir}")
+    logo_sinks.start(args)
+    if args.dedup:
+        logo_store.enable(args.dedup)
+
+    if args.refresh:
+        counts = logo_sources.refresh(logos_dir, save_high_quality_png)
+        print("\n" + "="*70)
+        print(f"Refresh पूरा! बदली नहीं: {counts['unchanged']}")
+        print(f"अपडेट हुईं: {counts['updated']}")
+        print(f"फेल: {counts['failed']}, फाइल गायब: {counts['missing']}")
+        print("="*70)
+        return
+
+    index = logo_sources.SourceIndex(logos_dir)
+    logo_metrics.start_export(args)
+    if args.trace:
+        logo_trace.enable(args.trace)
+    if args.profile:
+        logo_profile.enable(args.profile)
+    logo_cassette.start(args, [SESSION])
+    if args.startup_report:
+        startup.report("Ready")
+    stats = SourceStats(frozen=args.freeze_order)
+    success_count = 0
+    fail_count = 0
+    existing_count = 0
+    # logos folder एक ही बार scan होता है
+    existing = output_names.for_folder(logos_dir) if args.skip_existing else None
+
+    products = read_products(csv_file_path, defaults=('', '', 'Unknown'))
+    for number, (title, url, category) in enumerate(products, 1):
         domain = get_domain(url)
-        
+
         if not domain:
             print(f"Invalid URL skipped: {url}")
             continue
-            
+
+        # this script saves by name without -1/-2 suffixes, so rows whose
+        # names collide share one file and the name alone is the right check
+        if existing and existing.existing(filename_base(domain, title, category)):
+            existing_count += 1
+            continue
+
         print(f"\nProcessing: {domain} → {title}")
-        
-        if download_high_quality_png(domain, title, category, logos_dir):
+
+        with logo_trace.row(logo_trace.row_key(number, title or domain), domain=domain, title=title) as trace:
+            trace["ok"] = download_high_quality_png(domain, title, category, logos_dir, stats, index)
+        if trace["ok"]:
             success_count += 1
         else:
             fail_count += 1
 
-print("\n" + "="*70)
-print(f"समाप्त! कुल domains प्रोसेस: {success_count + fail_count}")
-print(f"सफल हाई क्वालिटी PNG डाउनलोड: {success_count}")
-print(f"फेल/नहीं मिले: {fail_count}")
-print(f"सभी PNG फाइलें यहाँ सेव: {logos_dir}")
-print("="*70)
+    logo_sinks.finish()
+    stats.save()
+    index.save()
+
+    print("\n" + "="*70)
+    print(f"समाप्त! कुल domains प्रोसेस: {success_count + fail_count}")
+    print(f"सफल हाई क्वालिटी PNG डाउनलोड: {success_count}")
+    print(f"फेल/नहीं मिले: {fail_count}")
+    if existing:
+        print(f"पहले से मौजूद (skip): {existing_count}")
+    if logo_store.summary():
+        print(f"Dedup (एक जैसी images एक बार): {logo_store.summary()}")
+    print(f"सभी PNG फाइलें यहाँ सेव: {logos_dir}")
+    print("="*70)
+    logo_metrics.finish_export(args)
+    if args.startup_report:
+        startup.report("Finished")
+
+
+if __name__ == "__main__":
+    main()
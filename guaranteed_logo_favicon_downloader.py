@@ -1,5 +1,4 @@
 import os
-import csv
 import requests
 import re
 from urllib.parse import urlparse, urljoin
@@ -7,6 +6,8 @@ from bs4 import BeautifulSoup
 from PIL import Image
 import io
 
+from product_csv import read_products
+
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
 }
@@ -138,23 +139,19 @@ total = 0
 success = 0
 not_found = 0
 
-with open(csv_path, "r", encoding="utf-8", newline="") as f:
-    reader = csv.DictReader(f)
-
-    for row in reader:
-        domain = get_domain(row.get("product.metafields.custom.custom", ""))
-        title = row.get("Title", "website")
+for title, url, _ in read_products(csv_path, defaults=("website", "", "")):
+    domain = get_domain(url)
 
-        if not domain:
-            continue
+    if not domain:
+        continue
 
-        total += 1
-        print(f"\n🔍 Processing: {domain}")
+    total += 1
+    print(f"\n🔍 Processing: {domain}")
 
-        if fetch_logo_or_favicon(domain, title, logos_dir):
-            success += 1
-        else:
-            not_found += 1
+    if fetch_logo_or_favicon(domain, title, logos_dir):
+        success += 1
+    else:
+        not_found += 1
 
 
 print("\n" + "=" * 60)
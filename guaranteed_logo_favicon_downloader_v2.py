@@ -1,17 +1,53 @@
+import startup
+
 import os
-import csv
 import requests
+from requests.adapters import HTTPAdapter
 import re
 from urllib.parse import urlparse, urljoin
-from bs4 import BeautifulSoup
-from PIL import Image
 import io
-from tkinter import Tk, filedialog
+import time
+import argparse
+# bs4, PIL and tkinter are imported where they are first needed
+
+from source_stats import SourceStats
+import logo_sources
+from logo_manifest import ManifestWriter, image_info
+from seen_domains import SeenDomains, SEEN_FILE
+from product_csv import read_products
+from logo_pipeline import Pipeline, Stage, Again, PROCESS, parse_workers
+import logo_sharding
+import logo_metrics
+import logo_trace
+import logo_profile
+import logo_cassette
+import output_names
+import logo_store
+import logo_sinks
+from logo_metrics import ROWS, STAGE_SECONDS, CACHE
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
 }
 
+# Keep-alive pool shared by every request (pipeline threads, logo_service)
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=64, pool_maxsize=64))
+SESSION.mount("http://", HTTPAdapter(pool_connections=64, pool_maxsize=64))
+
+# Default cascade order; SourceStats may reorder or skip per domain.
+SOURCES = ["html_logo", "html_icon", "favicon_ico", "google"]
+
+# Worker counts per stage for --pipeline
+PIPELINE_WORKERS = {
+    "resolve": 1,
+    "homepage": 16,
+    "extract": 2,
+    "download": 16,
+    "transcode": 2,
+    "write": 1,
+}
+
 # -------------------------------------------------
 def get_domain(url):
     if not url:
@@ -41,36 +77,50 @@ def clean_name(name):
 
 # -------------------------------------------------
 def unique_path(folder, name):
-    path = os.path.join(folder, name + ".png")
-    i = 1
-    while os.path.exists(path):
-        path = os.path.join(folder, f"{name}-{i}.png")
-        i += 1
-    return path
+    # the folder is scanned once per run; names are then handed out from memory
+    return output_names.for_folder(folder).allocate(name)
 
 
 # -------------------------------------------------
-def save_png(content, path):
+def save_png(content, path, info=None):
     try:
-        img = Image.open(io.BytesIO(content))
-        img = img.convert("RGBA")
-        img.save(path, "PNG", quality=100)
+        from PIL import Image
+        with logo_trace.span("decode"):
+            img = Image.open(io.BytesIO(content))
+            img = img.convert("RGBA")
+        with logo_trace.span("encode"):
+            out = io.BytesIO()
+            img.save(out, "PNG", quality=100)
+        with logo_trace.span("write"):
+            saved = logo_store.write(path, out.getvalue())
+        if info is not None:
+            # where the file really is (--sink sharded puts it in a subfolder)
+            info.update(image_info(content, img), path=saved)
         return True
     except:
         return False
 
 
 # -------------------------------------------------
-def download_image(url, final_path):
+def download_image(url, final_path, index=None, info=None, row=None):
     try:
-        r = requests.get(url, headers=HEADERS, timeout=20)
+        r = logo_metrics.timed_get(SESSION, url, headers=HEADERS, timeout=20)
         if r.status_code != 200:
             return False
 
         if "text/html" in r.headers.get("Content-Type", ""):
             return False
 
-        return save_png(r.content, final_path)
+        with STAGE_SECONDS.time(stage="encode"):
+            if not save_png(r.content, final_path, info):
+                return False
+
+        if info is not None:
+            info["source_url"] = url
+
+        if index:
+            index.record(final_path, url, r.headers, r.content, **(row or {}))
+        return True
     except:
         return False
 
@@ -83,103 +133,563 @@ def filename_from_title_or_domain(title, domain):
 
 
 # -------------------------------------------------
-def fetch_logo_or_favicon(domain, title, logos_dir):
+def fetch_logo_or_favicon(domain, title, logos_dir, stats=None, index=None, manifest=None, count_miss=True):
+    """Save the first logo the cascade finds. With count_miss=False a miss is
+    left uncounted, for callers that try another source afterwards."""
     homepage = f"https://{domain}"
 
     file_base = filename_from_title_or_domain(title, domain)
     final_path = unique_path(logos_dir, file_base)
 
-    soup = None
-    try:
-        r = requests.get(homepage, headers=HEADERS, timeout=20)
-        if r.status_code == 200:
-            soup = BeautifulSoup(r.text, "html.parser")
-    except:
-        pass
+    # homepage is only fetched if an HTML source is actually tried
+    page = {}
+    info = {}
+    # stored in the source index, for --skip-existing (and the stem for
+    # the shard merge, which names files as if the run had not been split)
+    row = {"title": title or "", "domain": domain, "stem": file_base}
+    row_start = time.time()
+
+    def get_soup():
+        if "soup" not in page:
+            page["soup"] = None
+            try:
+                r = logo_metrics.timed_get(SESSION, homepage, headers=HEADERS, timeout=20)
+                if r.status_code == 200:
+                    from bs4 import BeautifulSoup
+                    with STAGE_SECONDS.time(stage="parse"), logo_trace.span("parse", url=homepage):
+                        page["soup"] = BeautifulSoup(r.text, "html.parser")
+            except:
+                pass
+        return page["soup"]
 
     # 1️⃣ LOGO FROM HTML
-    if soup:
-        for img in soup.find_all("img"):
-            src = img.get("src", "")
-            alt = (img.get("alt") or "").lower()
-
-            if "logo" in alt or "logo" in src.lower():
-                if download_image(urljoin(homepage, src), final_path):
-                    print(f"✓ LOGO saved as: {os.path.basename(final_path)}")
-                    return True
+    def html_logo():
+        soup = get_soup()
+        if soup:
+            for img in soup.find_all("img"):
+                src = img.get("src", "")
+                alt = (img.get("alt") or "").lower()
+
+                if "logo" in alt or "logo" in src.lower():
+                    if download_image(urljoin(homepage, src), final_path, index, info, row):
+                        return True
+        return False
 
     # 2️⃣ FAVICON FROM HTML
-    if soup:
-        for link in soup.find_all("link"):
-            rel = " ".join(link.get("rel", [])).lower()
-            href = link.get("href")
-
-            if "icon" in rel and href:
-                if download_image(urljoin(homepage, href), final_path):
-                    print(f"✓ FAVICON saved as: {os.path.basename(final_path)}")
-                    return True
+    def html_icon():
+        soup = get_soup()
+        if soup:
+            for link in soup.find_all("link"):
+                rel = " ".join(link.get("rel", [])).lower()
+                href = link.get("href")
+
+                if "icon" in rel and href:
+                    if download_image(urljoin(homepage, href), final_path, index, info, row):
+                        return True
+        return False
 
     # 3️⃣ /favicon.ico
-    if download_image(f"{homepage}/favicon.ico", final_path):
-        print(f"✓ FAVICON saved as: {os.path.basename(final_path)}")
-        return True
+    def favicon_ico():
+        return download_image(f"{homepage}/favicon.ico", final_path, index, info, row)
 
     # 4️⃣ GOOGLE FALLBACK
-    google = f"https://www.google.com/s2/favicons?domain={domain}&sz=256"
-    if download_image(google, final_path):
-        print(f"✓ GOOGLE favicon saved as: {os.path.basename(final_path)}")
-        return True
+    def google():
+        url = f"https://www.google.com/s2/favicons?domain={domain}&sz=256"
+        return download_image(url, final_path, index, info, row)
+
+    steps = {
+        "html_logo": (html_logo, "LOGO"),
+        "html_icon": (html_icon, "FAVICON"),
+        "favicon_ico": (favicon_ico, "FAVICON"),
+        "google": (google, "GOOGLE favicon"),
+    }
+
+    order = stats.order(domain, SOURCES) if stats else SOURCES
+    for source in order:
+        step, label = steps[source]
+        start = time.time()
+        with logo_trace.span(source, "source"), logo_profile.stage(source):
+            ok = step()
+        STAGE_SECONDS.observe(time.time() - start, stage=source)
+        if stats:
+            stats.record(domain, source, ok, time.time() - start)
+        if ok:
+            info.setdefault("path", final_path)
+            print(f"✓ {label} saved as: {os.path.relpath(info['path'], logos_dir)}")
+            ROWS.inc(tier="favicon", source=source)
+            if manifest:
+                manifest.write(
+                    title=title, domain=domain, source=source,
+                    latency_ms=int((time.time() - row_start) * 1000), **info
+                )
+            return True
 
     print(f"❌ NOT FOUND: {domain}")
+    output_names.for_folder(logos_dir).release(final_path)
+    if not count_miss:
+        return False
+    ROWS.inc(tier="not_found", source="not_found")
+    if manifest:
+        manifest.write(
+            title=title, domain=domain, source="not_found",
+            latency_ms=int((time.time() - row_start) * 1000)
+        )
     return False
 
 
 # -------------------------------------------------
-# MAIN
+# PIPELINE MODE
 # -------------------------------------------------
-Tk().withdraw()
+def extract_candidates(job):
+    """Homepage HTML -> ordered (source, url) candidates. Runs in a process."""
+    from bs4 import BeautifulSoup
+
+    homepage = job["homepage"]
+    html = job.pop("html", None)
+    start = time.perf_counter()
+    soup = BeautifulSoup(html, "html.parser") if html else None
+    job["parse_s"] = time.perf_counter() - start
+
+    candidates = []
+    for source in job["order"]:
+        if source == "html_logo" and soup:
+            for img in soup.find_all("img"):
+                src = img.get("src", "")
+                alt = (img.get("alt") or "").lower()
+                if "logo" in alt or "logo" in src.lower():
+                    candidates.append((source, urljoin(homepage, src)))
+
+        elif source == "html_icon" and soup:
+            for link in soup.find_all("link"):
+                rel = " ".join(link.get("rel", [])).lower()
+                href = link.get("href")
+                if "icon" in rel and href:
+                    candidates.append((source, urljoin(homepage, href)))
+
+        elif source == "favicon_ico":
+            candidates.append((source, f"{homepage}/favicon.ico"))
+
+        elif source == "google":
+            candidates.append((source, f"https://www.google.com/s2/favicons?domain={job['domain']}&sz=256"))
+
+    job["candidates"] = candidates
+    return job
+
+
+def encode_png(job):
+    """Downloaded bytes -> PNG bytes. Runs in a process."""
+    job["png"] = None
+    if job.get("content"):
+        try:
+            from PIL import Image
+            start = time.perf_counter()
+            img = Image.open(io.BytesIO(job["content"]))
+            img = img.convert("RGBA")
+            job["decode_s"] = time.perf_counter() - start
+            out = io.BytesIO()
+            img.save(out, "PNG", quality=100)
+            job["encode_s"] = time.perf_counter() - start - job["decode_s"]
+            job["png"] = out.getvalue()
+            job["width"], job["height"] = img.size
+        except:
+            pass
+    return job
+
+
+def run_pipeline(rows, logos_dir, stats, index, manifest, workers):
+    """Same cascade as fetch_logo_or_favicon, split into stages with their
+    own worker pools. Yields (domain, ok) per row as rows finish."""
+
+    def resolve(row):
+        domain, title, key = row
+        return {
+            "domain": domain,
+            "title": title,
+            "key": key,
+            "homepage": f"https://{domain}",
+            "order": stats.order(domain, SOURCES),
+            "start": time.time(),
+        }
+
+    def fetch_homepage(job):
+        if "html_logo" in job["order"] or "html_icon" in job["order"]:
+            try:
+                with logo_trace.bind(job["key"]):
+                    r = logo_metrics.timed_get(SESSION, job["homepage"], headers=HEADERS, timeout=20)
+                if r.status_code == 200:
+                    job["html"] = r.text
+            except:
+                pass
+        return job
+
+    def download(job):
+        """Take candidates until one passes the header check; the rest stay
+        on the job in case that one fails to transcode (see write)."""
+        from PIL import Image
+
+        tried = {}
+        job["content"] = None
+        candidates = job["candidates"]
+        while candidates:
+            source, url = candidates.pop(0)
+            start = time.time()
+            ok = False
+            try:
+                with logo_trace.bind(job["key"]):
+                    r = logo_metrics.timed_get(SESSION, url, headers=HEADERS, timeout=20)
+                if r.status_code == 200 and "text/html" not in r.headers.get("Content-Type", ""):
+                    Image.open(io.BytesIO(r.content))  # header check only
+                    ok = True
+            except:
+                pass
+
+            seconds = tried.get(source, (False, 0.0))[1] + time.time() - start
+            tried[source] = (ok, seconds)
+            if ok:
+                job.update(
+                    content=r.content, source=source, source_url=url,
+                    etag=r.headers.get("ETag"), last_modified=r.headers.get("Last-Modified"),
+                )
+                break
+
+        for source, (ok, seconds) in tried.items():
+            stats.record(job["domain"], source, ok, seconds)
+        return job
+
+    def write(job):
+        with logo_trace.bind(job["key"]):
+            # process stages can't reach the trace file; their timings ride on the job
+            for step in ("parse", "decode", "encode"):
+                if job.get(step + "_s") is not None:
+                    logo_trace.record(step, job.pop(step + "_s"))
+            # passed the header check but didn't transcode: the remaining
+            # candidates go back through download, as the sequential cascade
+            # would try them, without holding up the write thread
+            if not job.get("png") and job.get("candidates"):
+                return Again("download", job)
+            job.pop("candidates", None)
+            result = save_output(job)
+            logo_trace.record("row", time.time() - job["start"], "row", ok=result[1])
+        return result
+
+    def save_output(job):
+        domain, title = job["domain"], job["title"]
+        latency_ms = int((time.time() - job["start"]) * 1000)
+
+        if not job.get("png"):
+            print(f"❌ NOT FOUND: {domain}")
+            ROWS.inc(tier="not_found", source="not_found")
+            if manifest:
+                manifest.write(title=title, domain=domain, source="not_found", latency_ms=latency_ms)
+            return domain, False
+
+        file_base = filename_from_title_or_domain(title, domain)
+        final_path = unique_path(logos_dir, file_base)
+        with logo_trace.span("write"):
+            saved = logo_store.write(final_path, job["png"])
+
+        headers = {"ETag": job["etag"], "Last-Modified": job["last_modified"]}
+        index.record(final_path, job["source_url"], headers, job["content"],
+                     title=title or "", domain=domain, stem=file_base)
+        print(f"✓ {job['source']} saved as: {os.path.relpath(saved, logos_dir)}")
+        ROWS.inc(tier="favicon", source=job["source"])
+        if manifest:
+            manifest.write(
+                title=title, domain=domain, source=job["source"], source_url=job["source_url"],
+                width=job.get("width"), height=job.get("height"), path=saved,
+                latency_ms=latency_ms, **image_info(job["content"])
+            )
+        return domain, True
+
+    def failed(job, error):
+        """A stage raised: the row still counts, as not found."""
+        if not isinstance(job, dict):  # failed in resolve, still a CSV row
+            job = {"domain": job[0], "title": job[1], "key": job[2], "start": time.time()}
+        ROWS.inc(tier="not_found", source="error")
+        if manifest:
+            manifest.write(title=job.get("title"), domain=job.get("domain"), source="error",
+                           latency_ms=int((time.time() - job["start"]) * 1000))
+        return job.get("domain"), False
+
+    pipeline = Pipeline([
+        Stage("resolve", resolve, workers["resolve"]),
+        Stage("homepage", fetch_homepage, workers["homepage"]),
+        Stage("extract", extract_candidates, workers["extract"], PROCESS),
+        Stage("download", download, workers["download"]),
+        Stage("transcode", encode_png, workers["transcode"], PROCESS),
+        Stage("write", write, workers["write"]),
+    ], on_error=failed)
+    yield from pipeline.run(rows)
+    pipeline.report()
+
+
+def run_sequential(rows, logos_dir, stats, index, manifest):
+    for domain, title, key in rows:
+        print(f"\n🔍 Processing: {title or domain}")
+        with logo_trace.row(key, domain=domain, title=title) as trace:
+            ok = fetch_logo_or_favicon(domain, title, logos_dir, stats, index, manifest)
+            trace["ok"] = ok
+        yield domain, ok
+
+
+def saved_outputs(logos_dir):
+    """(title, domain) -> path of the valid logo an earlier run saved for
+    that row. Goes by the source index rather than the file name, since
+    products whose titles clean to the same name get name-1.png, name-2.png
+    in whatever order they finished."""
+    names = output_names.for_folder(logos_dir)
+    saved = {}
+    for key, name in logo_sources.SourceIndex(logos_dir).outputs_by_row().items():
+        path = names.existing(os.path.splitext(name)[0])
+        if path:
+            saved[key] = path
+    return saved
 
-csv_path = filedialog.askopenfilename(
-    title="Select CSV File",
-    filetypes=[("CSV Files", "*.csv")]
-)
 
-if not csv_path:
-    print("❌ No CSV selected")
-    exit()
+# -------------------------------------------------
+def process_csv(csv_path, logos_dir, args, stats, index, manifest, seen, shard=None, existing=None):
+    """Run every row (or only the rows of one shard) through the cascade.
+    Returns the counters and, when sharded, the domains that were found
+    (the parent process owns the seen-domain file). `existing` is
+    saved_outputs() of the real logos folder when --skip-existing is on."""
+    counts = {"total": 0, "success": 0, "failed": 0, "skipped": 0, "existing": 0, "no_domain": 0}
+    found = []
+    # a shard's seen-domain file is read-only; domains it finds are skipped
+    # from here on, as seen.add() does for an unsharded run
+    found_here = set()
+
+    def rows():
+        for number, row in enumerate(read_products(csv_path), 1):
+            domain = get_domain(row.url)
+            if not domain:
+                # recorded once, by the first shard (every shard reads every row)
+                if shard in (None, 0):
+                    counts["no_domain"] += 1
+                    ROWS.inc(tier="not_found", source="no_domain")
+                    if manifest:
+                        manifest.write(title=row.title, domain=None, source="no_domain", latency_ms=0)
+                continue
+
+            if shard is not None and logo_sharding.shard_of(domain, args.shards) != shard:
+                continue
+
+            if seen is not None:
+                if domain in seen or domain in found_here:
+                    CACHE.inc(cache="seen_domains", result="hit")
+                    counts["skipped"] += 1
+                    continue
+                CACHE.inc(cache="seen_domains", result="miss")
+
+            if existing is not None:
+                if (row.title or "", domain) in existing:
+                    CACHE.inc(cache="output_files", result="hit")
+                    counts["existing"] += 1
+                    continue
+                CACHE.inc(cache="output_files", result="miss")
+
+            yield domain, row.title, logo_trace.row_key(number, row.title or domain)
+
+    if args.pipeline:
+        workers = parse_workers(args.stage_workers, PIPELINE_WORKERS)
+        results = run_pipeline(rows(), logos_dir, stats, index, manifest, workers)
+    else:
+        results = run_sequential(rows(), logos_dir, stats, index, manifest)
+
+    for domain, ok in results:
+        counts["total"] += 1
+        if ok:
+            counts["success"] += 1
+            if shard is not None:
+                found.append(domain)
+                found_here.add(domain)
+            elif seen is not None:
+                seen.add(domain)
+        else:
+            counts["failed"] += 1
 
-base_dir = os.path.dirname(csv_path)
-logos_dir = os.path.join(base_dir, "logos")
-os.makedirs(logos_dir, exist_ok=True)
+    return counts, found
 
-print(f"\n📂 Logos will be saved in:\n{logos_dir}")
 
-total = success = failed = 0
+def run_shard(job):
+    """Worker process for --shards: own HTTP pool, own staging folder."""
+    csv_path, logos_dir, args, shard = job
+    stage_dir = logo_sharding.shard_dir(logos_dir, shard)
+    os.makedirs(stage_dir, exist_ok=True)
 
-with open(csv_path, "r", encoding="utf-8", newline="") as f:
-    reader = csv.DictReader(f)
+    stats = SourceStats(frozen=args.freeze_order)
+    index = logo_sources.SourceIndex(stage_dir)
+    manifest = ManifestWriter(os.path.join(stage_dir, logo_sharding.MANIFEST_PART))
+    # read-only here; found domains are added by the parent
+    seen = SeenDomains(os.path.join(logos_dir, SEEN_FILE)) if args.skip_seen else None
+    # outputs of earlier runs live in the real folder, not the staging one
+    existing = saved_outputs(logos_dir) if args.skip_existing else None
+    # staging folders are plain; the parent moves the files into the real sink
+    logo_sinks.start()
+    if args.dedup:
+        logo_store.enable(args.dedup, logos_dir)
+    if args.trace:
+        logo_trace.enable(args.trace)
+    logo_cassette.start(args, [SESSION], shard)
 
-    for row in reader:
-        domain = get_domain(row.get("product.metafields.custom.custom", ""))
-        title = row.get("Title", "").strip()
+    counts, found = process_csv(csv_path, stage_dir, args, stats, index, manifest, seen, shard, existing)
 
-        if not domain:
-            continue
+    index.save()
+    manifest.close()
+    logo_cassette.finish()
+    return shard, counts, found, stats.new, logo_metrics.REGISTRY.snapshot()
 
-        total += 1
-        print(f"\n🔍 Processing: {title or domain}")
 
-        if fetch_logo_or_favicon(domain, title, logos_dir):
-            success += 1
-        else:
-            failed += 1
+# -------------------------------------------------
+def parse_args():
+    parser = argparse.ArgumentParser(description="Download a logo or favicon per CSV row")
+    parser.add_argument("--csv", help="CSV file (opens a file picker when omitted)")
+    parser.add_argument(
+        "--freeze-order", action="store_true",
+        help="always use the fixed source order (reproducible runs)"
+    )
+    parser.add_argument(
+        "--refresh", action="store_true",
+        help="revalidate existing logos against their recorded source URLs instead of a full run"
+    )
+    parser.add_argument(
+        "--manifest",
+        help="write one record per row as it finishes (.jsonl, .csv or .parquet)"
+    )
+    parser.add_argument(
+        "--skip-seen", action="store_true",
+        help="skip domains already downloaded by this or a previous run"
+    )
+    parser.add_argument(
+        "--skip-existing", action="store_true",
+        help="skip rows whose logo is already a valid image in the logos folder"
+    )
+    parser.add_argument(
+        "--pipeline", action="store_true",
+        help="run rows through staged worker pools instead of one at a time"
+    )
+    parser.add_argument(
+        "--stage-workers",
+        help="worker counts per pipeline stage, e.g. homepage=32,transcode=4"
+    )
+    parser.add_argument(
+        "--shards", type=int, default=1,
+        help="split rows by domain hash across this many worker processes"
+    )
+    parser.add_argument(
+        "--startup-report", action="store_true",
+        help="print time to first row and which heavy modules got imported"
+    )
+    logo_metrics.add_arguments(parser)
+    logo_trace.add_arguments(parser)
+    logo_profile.add_arguments(parser)
+    logo_cassette.add_arguments(parser)
+    logo_store.add_arguments(parser)
+    logo_sinks.add_arguments(parser)
+    return parser.parse_args()
 
 
-print("\n" + "=" * 60)
-print("📊 SUMMARY")
-print(f"Total processed : {total}")
-print(f"Downloaded      : {success}")
-print(f"Not found       : {failed}")
-print("📁 Image name = CSV Title → else Domain name")
-print("📁 All images saved in /logos folder")
-print("=" * 60)
+# -------------------------------------------------
+# MAIN
+# -------------------------------------------------
+def main():
+    args = parse_args()
+
+    csv_path = args.csv
+    if not csv_path:
+        from tkinter import Tk, filedialog
+        Tk().withdraw()
+
+        csv_path = filedialog.askopenfilename(
+            title="Select CSV File",
+            filetypes=[("CSV Files", "*.csv")]
+        )
+
+    if not csv_path:
+        print("❌ No CSV selected")
+        return
+
+    base_dir = os.path.dirname(csv_path)
+    logos_dir = os.path.join(base_dir, "logos")
+    os.makedirs(logos_dir, exist_ok=True)
+
+    print(f"\n📂 Logos will be saved in:\n{logos_dir}")
+    logo_metrics.start_export(args)
+    if args.trace:
+        logo_trace.enable(args.trace)
+    if args.profile:
+        logo_profile.enable(args.profile)
+    if args.shards <= 1:
+        # shard workers open their own cassette (see run_shard)
+        logo_cassette.start(args, [SESSION])
+    logo_sinks.start(args)
+    if args.dedup:
+        logo_store.enable(args.dedup)
+
+    if args.refresh:
+        counts = logo_sources.refresh(logos_dir, save_png)
+        print("\n" + "=" * 60)
+        print("🔄 REFRESH SUMMARY")
+        print(f"Unchanged       : {counts['unchanged']}")
+        print(f"Updated         : {counts['updated']}")
+        print(f"Failed          : {counts['failed']}")
+        print(f"Missing files   : {counts['missing']}")
+        print("=" * 60)
+        return
+
+    index = logo_sources.SourceIndex(logos_dir)
+    stats = SourceStats(frozen=args.freeze_order)
+    manifest = ManifestWriter(args.manifest) if args.manifest else None
+    seen = SeenDomains(os.path.join(logos_dir, SEEN_FILE)) if args.skip_seen else None
+    existing = saved_outputs(logos_dir) if args.skip_existing else None
+    if args.startup_report:
+        startup.report("Ready")
+
+    if args.shards > 1:
+        jobs = [(csv_path, logos_dir, args, i) for i in range(args.shards)]
+        counts = {"total": 0, "success": 0, "failed": 0, "skipped": 0, "existing": 0, "no_domain": 0}
+        for _, shard_counts, found, new_stats, shard_metrics in logo_sharding.run_shards(run_shard, jobs, args.shards):
+            for key in counts:
+                counts[key] += shard_counts[key]
+            stats.merge(new_stats)
+            logo_metrics.REGISTRY.merge(shard_metrics)
+            if seen is not None:
+                for domain in found:
+                    seen.add(domain)
+        logo_sharding.merge_shard_dirs(
+            logos_dir, args.shards,
+            lambda stem: unique_path(logos_dir, stem), index, manifest, logo_sinks.move
+        )
+    else:
+        counts, _ = process_csv(csv_path, logos_dir, args, stats, index, manifest, seen, existing=existing)
+
+    logo_sinks.finish()
+    stats.save()
+    index.save()
+    if manifest:
+        manifest.close()
+    if seen is not None:
+        seen.close()
+
+    print("\n" + "=" * 60)
+    print("📊 SUMMARY")
+    print(f"Total processed : {counts['total']}")
+    print(f"Downloaded      : {counts['success']}")
+    print(f"Not found       : {counts['failed']}")
+    if counts["no_domain"]:
+        print(f"No domain       : {counts['no_domain']}")
+    if seen is not None:
+        print(f"Already seen    : {counts['skipped']}")
+    if existing is not None:
+        print(f"Already on disk : {counts['existing']}")
+    if logo_store.summary():
+        print(f"Dedup           : {logo_store.summary()}")
+    print("📁 Image name = CSV Title → else Domain name")
+    print("📁 All images saved in /logos folder")
+    print("=" * 60)
+    logo_metrics.finish_export(args)
+    if args.startup_report:
+        startup.report("Finished")
+
+
+if __name__ == "__main__":
+    main()
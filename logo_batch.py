@@ -0,0 +1,313 @@
+import os
+import glob
+import json
+import queue
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import capterra_planner
+import chrome_driver
+import capterra_logo_downloader_v5 as v5
+from product_csv import read_products
+from logo_manifest import ManifestWriter
+import logo_metrics
+import logo_trace
+import logo_profile
+import logo_cassette
+import logo_store
+import logo_sinks
+from logo_metrics import ROWS, STAGE_SECONDS
+
+
+# ================= CATEGORY =================
+class Category:
+    """One CSV plus its Capterra category URL, crawled a page at a time."""
+
+    def __init__(self, csv_path, category_url, skip_existing=False):
+        self.csv_path = csv_path
+        self.name = os.path.basename(csv_path)
+        self.category_url = category_url
+        self.page_url = category_url
+        self.page_no = 0
+        self.known_pages = None
+        self.crawl_start = 0
+        self.crawl_hits = 0
+        self.crawl_failed = False
+
+        self.logos_dir = os.path.join(os.path.dirname(csv_path), "logos")
+        os.makedirs(self.logos_dir, exist_ok=True)
+
+        self.total = 0
+        self.pending = {}
+        for row in read_products(csv_path):
+            self.total += 1
+            if not row.title:
+                continue
+            if skip_existing and v5.already_saved(self.logos_dir, row.title):
+                ROWS.inc(tier="existing", source="on_disk")
+                continue
+            self.pending[v5.normalize(row.title)] = row
+
+
+def load_categories(specs, mapping_file=None, skip_existing=False):
+    """`specs` are CSV paths or globs, optionally as "path.csv=category_url".
+    URLs for the rest come from `mapping_file` (JSON: csv name or stem -> url)."""
+    mapping = {}
+    if mapping_file:
+        with open(mapping_file, encoding="utf-8") as f:
+            mapping = json.load(f)
+
+    categories = []
+    for spec in specs:
+        pattern, _, url = spec.partition("=")
+        for csv_path in sorted(glob.glob(pattern)) or [pattern]:
+            name = os.path.basename(csv_path)
+            category_url = url or mapping.get(name) or mapping.get(os.path.splitext(name)[0])
+            if not os.path.exists(csv_path):
+                print(f"❌ CSV not found: {csv_path}")
+                continue
+            if not category_url:
+                print(f"⚠️ No category URL for {name}, favicon cascade only")
+            categories.append(Category(csv_path, category_url, skip_existing))
+    return categories
+
+
+# ================= BATCH RUN =================
+class BatchRun:
+    """Shares one browser pool, one HTTP pool and the planner history across
+    all categories. Every crawled page is queued as its own browser task, so
+    pages of different categories interleave and no browser sits idle while
+    another category's downloads run on the HTTP threads."""
+
+    def __init__(self, browsers=2, http_workers=16, headless=True, strategy="auto",
+                 driver_path=None, profile_dir=None, profile_max_mb=None, capture=False):
+        self.browsers = browsers
+        self.driver_path = driver_path
+        self.profile_dir = profile_dir
+        self.capture = capture
+        self.profile_max_mb = profile_max_mb or chrome_driver.PROFILE_MAX_MB
+        self.headless = headless
+        self.strategy = strategy
+        self.drivers = queue.Queue()
+        self.started = 0
+        self.browser_pool = ThreadPoolExecutor(max_workers=browsers)
+        self.http_pool = ThreadPoolExecutor(max_workers=http_workers)
+        self.history = capterra_planner.load_history()
+
+        self.lock = threading.Lock()
+        self.idle = threading.Condition(self.lock)
+        self.outstanding = 0
+
+    # ---------- task bookkeeping ----------
+    def _submit(self, pool, fn, *args):
+        with self.lock:
+            self.outstanding += 1
+        pool.submit(self._run, fn, *args)
+
+    def _run(self, fn, *args):
+        try:
+            with logo_profile.stage(fn.__name__):
+                fn(*args)
+        except Exception as e:
+            print(f"⚠️ {fn.__name__} failed: {e}")
+        finally:
+            with self.lock:
+                self.outstanding -= 1
+                if self.outstanding == 0:
+                    self.idle.notify_all()
+
+    # ---------- browser pool ----------
+    def _driver(self):
+        with self.lock:
+            start_new = self.drivers.empty() and self.started < self.browsers
+            slot = self.started
+            if start_new:
+                self.started += 1
+        if start_new:
+            profile = None
+            if self.profile_dir:
+                profile = chrome_driver.profile_slot(self.profile_dir, slot, self.profile_max_mb)
+            try:
+                return v5.make_driver(self.headless, self.driver_path, profile,
+                                      self.profile_max_mb, self.capture)
+            except:
+                # give the slot back, or later tasks wait forever on drivers.get()
+                with self.lock:
+                    self.started -= 1
+                raise
+        return self.drivers.get()
+
+    # ---------- planning ----------
+    def _choose(self, cat):
+        if not cat.category_url or cat.crawl_failed:
+            return capterra_planner.FAVICON
+        if self.strategy != "auto":
+            return self.strategy
+        with self.lock:
+            left = capterra_planner.pages_left(
+                self.history, cat.category_url, cat.page_no, len(cat.pending), cat.known_pages
+            )
+            return capterra_planner.plan(len(cat.pending), left, self.history)
+
+    def start(self, cat):
+        cat.crawl_start = len(cat.pending)
+        print(f"🧭 {cat.name}: {self._choose(cat)} ({len(cat.pending)} pending)")
+        self._next(cat)
+
+    def _next(self, cat):
+        strategy = self._choose(cat)
+        if strategy == capterra_planner.CRAWL and cat.page_url and cat.pending:
+            self._submit(self.browser_pool, self.crawl, cat)
+            return
+
+        if cat.page_no and not cat.page_url:
+            with self.lock:
+                self.history["pages"][cat.category_url] = cat.page_no
+                capterra_planner.update_rate(self.history, "crawl_hit_rate", cat.crawl_hits, cat.crawl_start)
+
+        rows = list(cat.pending.values())
+        cat.pending.clear()
+        for row in rows:
+            if strategy == capterra_planner.LOOKUP:
+                self._submit(self.browser_pool, self.lookup, cat, row)
+            else:
+                self._submit(self.http_pool, self.fallback, cat, row)
+
+    # ---------- tasks ----------
+    def crawl(self, cat):
+        try:
+            driver, wait = self._driver()
+            try:
+                with STAGE_SECONDS.time(stage="crawl_page"):
+                    matches, cat.page_url, pages = v5.crawl_page(
+                        driver, wait, cat.page_url, cat.pending, self.capture
+                    )
+            finally:
+                self.drivers.put((driver, wait))
+
+            cat.page_no += 1
+            cat.known_pages = cat.known_pages or pages
+            cat.crawl_hits += len(matches)
+            for row, img_url in matches:
+                self._submit(self.http_pool, self.save, cat, row, img_url)
+        except:
+            # the rest of the category still gets the favicon cascade
+            cat.crawl_failed = True
+            raise
+        finally:
+            # queued behind the other categories' pages
+            self._next(cat)
+
+    def lookup(self, cat, row):
+        img_url = None
+        try:
+            driver, wait = self._driver()
+            try:
+                with STAGE_SECONDS.time(stage="lookup"):
+                    img_url = v5.lookup_product(driver, wait, cat.category_url, row.title)
+            finally:
+                self.drivers.put((driver, wait))
+        except Exception as e:
+            print(f"⚠️ lookup failed for {row.title}: {e}")
+        # without a Capterra image save() falls back to the favicon cascade
+        self._submit(self.http_pool, self.save, cat, row, img_url)
+
+    def save(self, cat, row, img_url):
+        # the same title can be pending in several CSVs
+        v5.save_capterra_logo(row, img_url, cat.logos_dir, f"{cat.name}:{row.title}")
+
+    def fallback(self, cat, row):
+        v5.favicon_fallback(row, cat.logos_dir, f"{cat.name}:{row.title}")
+
+    # ---------- run ----------
+    def run(self, categories):
+        for cat in categories:
+            self.start(cat)
+
+        with self.lock:
+            while self.outstanding:
+                self.idle.wait()
+
+        self.browser_pool.shutdown()
+        self.http_pool.shutdown()
+        while not self.drivers.empty():
+            driver, _ = self.drivers.get()
+            driver.quit()
+        capterra_planner.save_history(self.history)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run many category CSVs in one process")
+    parser.add_argument("csv", nargs="+", help="CSV paths or globs, optionally path.csv=category_url")
+    parser.add_argument("--categories", help="JSON file mapping CSV name to Capterra category URL")
+    parser.add_argument("--browsers", type=int, default=2, help="Chrome instances shared by all CSVs")
+    parser.add_argument("--http-workers", type=int, default=16)
+    parser.add_argument("--show-browser", action="store_true", help="don't run Chrome headless")
+    parser.add_argument("--strategy", choices=["auto"] + capterra_planner.STRATEGIES, default="auto")
+    parser.add_argument("--manifest", help="one manifest for all CSVs (.jsonl, .csv or .parquet)")
+    parser.add_argument("--chromedriver", help="explicit chromedriver path (also $CHROMEDRIVER)")
+    parser.add_argument("--profile-dir", nargs="?", const=chrome_driver.PROFILE_DIR,
+                        help="persistent Chrome profiles (one per browser) reused across runs")
+    parser.add_argument("--profile-max-mb", type=int, default=chrome_driver.PROFILE_MAX_MB)
+    parser.add_argument("--network-capture", action="store_true",
+                        help="read listing data from captured network responses, DOM as fallback")
+    parser.add_argument("--skip-existing", action="store_true",
+                        help="skip rows whose logo is already a valid image in their logos folder")
+    logo_metrics.add_arguments(parser)
+    logo_trace.add_arguments(parser)
+    logo_profile.add_arguments(parser)
+    logo_cassette.add_arguments(parser)
+    logo_store.add_arguments(parser)
+    logo_sinks.add_arguments(parser)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    categories = load_categories(args.csv, args.categories, args.skip_existing)
+    if not categories:
+        print("❌ No CSVs to process")
+        return
+
+    logo_metrics.start_export(args)
+    if args.trace:
+        logo_trace.enable(args.trace)
+    if args.profile:
+        logo_profile.enable(args.profile)
+    logo_cassette.start(args, [v5.SESSION])
+    logo_sinks.start(args)
+    if args.dedup:
+        logo_store.enable(args.dedup)
+    if args.manifest:
+        v5.MANIFEST = ManifestWriter(args.manifest)
+
+    batch = BatchRun(args.browsers, args.http_workers, not args.show_browser,
+                     args.strategy, args.chromedriver, args.profile_dir, args.profile_max_mb,
+                     args.network_capture)
+    batch.run(categories)
+    logo_sinks.finish()
+
+    if v5.MANIFEST:
+        v5.MANIFEST.close()
+
+    print("\n" + "=" * 50)
+    print("📊 BATCH SUMMARY")
+    print("=" * 50)
+    print(f"📁 CSV files            : {len(categories)}")
+    print(f"🔢 Total softwares      : {sum(c.total for c in categories)}")
+    print(f"🟢 Capterra logos       : {ROWS.value(tier='capterra')}")
+    print(f"🟡 Website/Favicon used : {ROWS.value(tier='favicon')}")
+    print(f"🔴 Not found            : {ROWS.value(tier='not_found')}")
+    if args.skip_existing:
+        print(f"⏭️  Already on disk      : {ROWS.value(tier='existing')}")
+    print(f"🌐 HTTP requests        : {logo_metrics.HTTP_REQUESTS.value()}")
+    if logo_store.summary():
+        print(f"♻️  Dedup                : {logo_store.summary()}")
+    print("=" * 50)
+    logo_metrics.finish_export(args)
+
+
+if __name__ == "__main__":
+    main()
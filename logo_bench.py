@@ -0,0 +1,252 @@
+"""Microbenchmarks for the hot helpers.
+
+    python logo_bench.py                 run and compare with the saved baseline
+    python logo_bench.py --save          run and store the results as the new baseline
+    python logo_bench.py -k match        only benchmarks whose name contains "match"
+
+Inputs are generated on the fly: 10k synthetic product titles / CSV rows,
+homepage HTML of three sizes shaped like real storefronts (head full of
+meta/link tags, nav, product grids, inline scripts) and PNG/ICO icons from
+16 to 1024 px. Exit status is 1 when any benchmark is slower than its
+baseline by more than --threshold.
+"""
+import io
+import os
+import csv
+import json
+import random
+import timeit
+import shutil
+import argparse
+import platform
+import tempfile
+
+import chrome_driver
+import output_names
+
+
+BASELINE_FILE = os.path.join(chrome_driver.STATE_DIR, "bench_baseline.json")
+THRESHOLD = 0.20
+REPEAT = 5
+
+WORDS = [
+    "cloud", "crm", "pro", "hub", "desk", "flow", "suite", "one", "labs", "ai",
+    "pay", "books", "track", "sync", "ly", "works", "base", "point", "stack", "go",
+    "zen", "smart", "team", "metrics", "shop", "cart", "mail", "chat", "sign", "forms",
+]
+SUFFIXES = ["", " Inc.", " (Beta)", " — Enterprise", " 2.0", " & Co", " CRM", " for Teams"]
+
+
+# ================= INPUTS =================
+def make_titles(n=10000, seed=7):
+    rnd = random.Random(seed)
+    titles = []
+    for _ in range(n):
+        name = " ".join(rnd.choice(WORDS).title() for _ in range(rnd.randint(1, 3)))
+        titles.append(name + rnd.choice(SUFFIXES))
+    return titles
+
+
+def make_urls(titles, seed=7):
+    rnd = random.Random(seed)
+    forms = [
+        "https://www.{d}.com/", "http://{d}.io", "{d}.com", "https://app.{d}.com/login?ref=capterra",
+        "[{d}.com](https://{d}.com)", "\"https://{d}.co.uk/\"", "www.{d}.net (official)",
+    ]
+    return [rnd.choice(forms).format(d=t.lower().split()[0] + str(i)) for i, t in enumerate(titles)]
+
+
+def make_csv(path, titles, urls):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["Handle", "Title", "Body (HTML)", "Vendor", "Tags",
+                    "product.metafields.custom.custom", "product.metafields.custom.category"])
+        for t, u in zip(titles, urls):
+            w.writerow([t.lower().replace(" ", "-"), t, "<p>" + t * 20 + "</p>", "vendor",
+                        "saas, software", u, "Accounting"])
+
+
+def make_html(products, seed=7):
+    """A storefront-like homepage; `products` controls the size."""
+    rnd = random.Random(seed)
+    head = ['<meta charset="utf-8"><title>Acme</title>']
+    head += [f'<meta name="m{i}" content="{"x" * 40}">' for i in range(40)]
+    head += [f'<link rel="preload" href="/static/chunk-{i}.js" as="script">' for i in range(20)]
+    head += [
+        '<link rel="icon" type="image/png" sizes="32x32" href="/favicon-32x32.png">',
+        '<link rel="apple-touch-icon" href="/apple-touch-icon.png">',
+        '<link rel="stylesheet" href="/static/main.css">',
+    ]
+    body = ['<header><a href="/"><img class="site-logo" alt="Acme logo" src="/img/logo.svg"></a>']
+    body += [f'<nav><ul>{"".join(f"<li><a href=/c/{i}>Category {i}</a></li>" for i in range(30))}</ul></nav></header>']
+    for i in range(products):
+        body.append(
+            f'<div class="card product" data-id="{i}"><a href="/p/{i}">'
+            f'<img src="/img/p/{i}.jpg" alt="Product {i}" loading="lazy" width="300" height="300"></a>'
+            f'<h3>{rnd.choice(WORDS).title()} {i}</h3><p class="price">${rnd.randint(5, 500)}.00</p>'
+            f'<button class="btn add-to-cart">Add to cart</button></div>'
+        )
+    body += [f'<script>window.__DATA__{i} = {json.dumps({"k": "v" * 200})};</script>' for i in range(10)]
+    body.append('<footer><img src="/img/footer-logo.png" alt="Acme"></footer>')
+    return f"<!doctype html><html><head>{''.join(head)}</head><body>{''.join(body)}</body></html>"
+
+
+def make_icon(size, fmt):
+    from PIL import Image
+    img = Image.new("RGBA", (size, size))
+    rnd = random.Random(size)
+    # noisy pixels so the encoder can't take shortcuts
+    img.putdata([(rnd.randrange(256), rnd.randrange(256), rnd.randrange(256), 255)
+                 for _ in range(size * size)])
+    out = io.BytesIO()
+    if fmt == "ico":
+        img.save(out, "ICO", sizes=[(size, size)])
+    else:
+        img.save(out, "PNG")
+    return out.getvalue()
+
+
+# ================= BENCHMARKS =================
+def benchmarks(work_dir):
+    """(name, callable) pairs; all setup happens here, outside the timing."""
+    import capterra_logo_downloader_v5 as v5
+    import guaranteed_logo_favicon_downloader_v2 as g2
+    import download_high_quality_logos_v2 as hq
+    from product_csv import read_products
+
+    titles = make_titles()
+    urls = make_urls(titles)
+    csv_path = os.path.join(work_dir, "products.csv")
+    make_csv(csv_path, titles, urls)
+
+    pending = {v5.normalize(t): t for t in titles}
+    scraped = "Completely Different Product Name"
+
+    # 50 titles that all collapse to the same clean_name
+    collide_dir = os.path.join(work_dir, "collide")
+    os.makedirs(collide_dir)
+    for i in range(50):
+        name = "acme.png" if i == 0 else f"acme-{i}.png"
+        open(os.path.join(collide_dir, name), "wb").close()
+
+    jobs = {}
+    for label, products in [("10kb", 10), ("100kb", 150), ("600kb", 1000)]:
+        jobs[label] = {"homepage": "https://acme.com", "domain": "acme.com",
+                       "order": g2.SOURCES, "html": make_html(products)}
+
+    out = os.path.join(work_dir, "out")
+
+    def each(fn, items):
+        return lambda: [fn(x) for x in items]
+
+    sample = titles[:1000]
+    sample_urls = urls[:1000]
+
+    yield "normalize x1000", each(v5.normalize, sample)
+    yield "get_domain v5 x1000", each(v5.get_domain, sample_urls)
+    yield "get_domain guaranteed_v2 x1000", each(g2.get_domain, sample_urls)
+    yield "get_domain high_quality_v2 x1000", each(hq.get_domain, sample_urls)
+    yield "clean_name x1000", each(g2.clean_name, sample)
+    yield "safe_base_path x1000", each(lambda t: v5.safe_base_path(out, t), sample)
+    try:
+        import capterra_logo_downloader_v2 as c2  # imports selenium at module level
+        yield "sanitize x1000", each(c2.sanitize, sample)
+    except ImportError:
+        pass
+    yield "match_pending 10k pending, miss", lambda: v5.match_pending(pending, scraped)
+    names = output_names.for_folder(collide_dir)
+    yield "unique_path 50 collisions", lambda: names.release(g2.unique_path(collide_dir, "acme"))
+    yield "read_products 10k rows", lambda: sum(1 for _ in read_products(csv_path))
+
+    for label, job in jobs.items():
+        yield f"extract_candidates {label}", lambda job=job: g2.extract_candidates(dict(job))
+
+    for size in (16, 64, 256, 1024):
+        png = make_icon(size, "png")
+        yield f"save_png {size}px png", lambda png=png: g2.save_png(png, out + ".png")
+        yield f"save_image {size}px png", lambda png=png: v5.save_image(png, ".png", out)
+    for size in (16, 48, 256):
+        ico = make_icon(size, "ico")
+        yield f"save_png {size}px ico", lambda ico=ico: g2.save_png(ico, out + ".png")
+        yield f"save_image {size}px ico", lambda ico=ico: v5.save_image(ico, ".ico", out)
+
+
+def measure(fn):
+    """Best seconds per call over REPEAT runs of an auto-sized loop."""
+    timer = timeit.Timer(fn)
+    loops, _ = timer.autorange()
+    return min(timer.repeat(REPEAT, loops)) / loops
+
+
+def human(seconds):
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:8.2f} ms"
+    return f"{seconds * 1e6:8.1f} µs"
+
+
+def load_baseline(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f).get("results", {})
+    except:
+        return {}
+
+
+def save_baseline(path, results):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "results": results,
+        }, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the hot helper functions")
+    parser.add_argument("-k", dest="filter", help="only run benchmarks whose name contains this")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="allowed slowdown before a benchmark counts as a regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.baseline)
+    results = {}
+    regressions = []
+    work_dir = tempfile.mkdtemp(prefix="logo_bench_")
+
+    try:
+        for name, fn in benchmarks(work_dir):
+            if args.filter and args.filter not in name:
+                continue
+            seconds = measure(fn)
+            results[name] = seconds
+
+            line = f"{name:38} {human(seconds)}"
+            base = baseline.get(name)
+            if base:
+                change = seconds / base - 1
+                mark = ""
+                if change > args.threshold:
+                    regressions.append(name)
+                    mark = "  ⚠️ REGRESSION"
+                elif change < -args.threshold:
+                    mark = "  🚀"
+                line += f"   base {human(base)}  {change * 100:+6.1f}%{mark}"
+            print(line)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.save:
+        # keep baselines of benchmarks filtered out of this run
+        save_baseline(args.baseline, {**baseline, **results})
+        print(f"\n💾 Baseline saved to {args.baseline}")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) over {args.threshold * 100:.0f}%: {', '.join(regressions)}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
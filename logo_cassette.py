@@ -0,0 +1,216 @@
+"""Record and replay the HTTP traffic of a run.
+
+    python guaranteed_logo_favicon_downloader_v2.py --csv shop.csv --record shop.cassette
+    python guaranteed_logo_favicon_downloader_v2.py --csv shop.csv --replay shop.cassette
+    python guaranteed_logo_favicon_downloader_v2.py --csv shop.csv --replay shop.cassette --replay-latency zero
+
+A cassette is gzipped JSON lines: one "exchange" line per request (method,
+URL, status, headers, body hash, time to headers, total time) and one
+"body" line per distinct body, so the thousand identical Google globe icons
+of a catalog are stored once. Replay answers from the cassette through the
+same SESSION adapters, sleeping the recorded time (or not at all) so engine
+changes can be compared offline on an identical workload. Requests that
+failed while recording (timeouts, connection errors) are stored with their
+exception class and replay as the same exception after the same wait.
+Requests missing from the cassette fail like a connection error and are
+counted.
+
+Only traffic through the scripts' SESSIONs is covered; Chrome's own
+requests are not.
+"""
+import io
+import glob
+import gzip
+import json
+import time
+import base64
+import atexit
+import hashlib
+import threading
+from collections import defaultdict
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+
+CASSETTE = None
+
+
+class Recorder:
+    def __init__(self, path):
+        self.path = path
+        self.file = gzip.open(path, "wt", encoding="utf-8")
+        self.lock = threading.Lock()
+        self.bodies = set()
+        self.count = 0
+
+    def add(self, request, response, ttfb, total):
+        content = response.content or b""
+        sha1 = hashlib.sha1(content).hexdigest()
+        lines = []
+        with self.lock:
+            if sha1 not in self.bodies:
+                self.bodies.add(sha1)
+                lines.append({"type": "body", "sha1": sha1, "data": base64.b64encode(content).decode()})
+            lines.append({
+                "type": "exchange", "method": request.method, "url": request.url,
+                "status": response.status_code, "reason": response.reason,
+                "headers": dict(response.headers), "sha1": sha1,
+                "ttfb_ms": round(ttfb * 1000, 1), "total_ms": round(total * 1000, 1),
+            })
+            for line in lines:
+                self.file.write(json.dumps(line) + "\n")
+            self.count += 1
+
+    def add_error(self, request, error, total):
+        with self.lock:
+            self.file.write(json.dumps({
+                "type": "exchange", "method": request.method, "url": request.url,
+                "error": type(error).__name__, "message": str(error),
+                "total_ms": round(total * 1000, 1),
+            }) + "\n")
+            self.count += 1
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+                print(f"📼 Recorded {self.count} requests ({len(self.bodies)} distinct bodies) to {self.path}")
+
+
+class Player:
+    def __init__(self, path, latency="recorded"):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.bodies = {}
+        self.exchanges = defaultdict(list)
+        self.next = defaultdict(int)
+        self.hits = 0
+        self.misses = 0
+
+        # shard runs record one file per shard next to the main one
+        for name in glob.glob(glob.escape(path)) + sorted(glob.glob(glob.escape(path) + ".shard-*")):
+            self._load(name)
+
+    def _load(self, name):
+        with gzip.open(name, "rt", encoding="utf-8") as f:
+            try:
+                for line in f:
+                    item = json.loads(line)
+                    if item["type"] == "body":
+                        self.bodies[item["sha1"]] = base64.b64decode(item["data"])
+                    else:
+                        self.exchanges[(item["method"], item["url"])].append(item)
+            except (EOFError, ValueError):
+                pass  # cut off by a crash; keep what came before
+
+    def take(self, request):
+        """Recorded exchanges for a URL are replayed in order; the last one
+        repeats if the run asks more often than the recording did."""
+        key = (request.method, request.url)
+        with self.lock:
+            recorded = self.exchanges.get(key)
+            if not recorded:
+                self.misses += 1
+                return None
+            i = self.next[key]
+            self.next[key] = i + 1
+            self.hits += 1
+            return recorded[min(i, len(recorded) - 1)]
+
+    def respond(self, request):
+        item = self.take(request)
+        if item is None:
+            raise requests.ConnectionError(f"not in cassette: {request.method} {request.url}")
+        if self.latency == "recorded":
+            time.sleep(item["total_ms"] / 1000)
+        if "error" in item:
+            # requests' own exception classes; anything else replays as a connection error
+            error = getattr(requests.exceptions, item["error"], None)
+            if not (isinstance(error, type) and issubclass(error, requests.RequestException)):
+                error = requests.ConnectionError
+            raise error(item.get("message", ""), request=request)
+
+        content = self.bodies.get(item["sha1"], b"")
+        response = requests.Response()
+        response.status_code = item["status"]
+        response.reason = item.get("reason")
+        response.headers = CaseInsensitiveDict(item["headers"])
+        # bodies are stored decoded
+        response.headers.pop("Content-Encoding", None)
+        response._content = content
+        response._content_consumed = True
+        response.raw = io.BytesIO(content)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        print(f"📼 Replayed {self.hits} requests, {self.misses} not in cassette")
+
+
+class CassetteAdapter(HTTPAdapter):
+    def __init__(self, cassette, **kwargs):
+        self.cassette = cassette
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if isinstance(self.cassette, Player):
+            return self.cassette.respond(request)
+
+        start = time.perf_counter()
+        kwargs["stream"] = True  # headers first, so time to headers can be told apart
+        try:
+            response = super().send(request, **kwargs)
+            ttfb = time.perf_counter() - start
+            response.content  # read the body so it can be stored
+        except Exception as e:
+            self.cassette.add_error(request, e, time.perf_counter() - start)
+            raise
+        self.cassette.add(request, response, ttfb, time.perf_counter() - start)
+        return response
+
+
+def start(args, sessions, shard=None):
+    """Mount the recorder / player on `sessions` if --record / --replay was given."""
+    global CASSETTE
+    record = getattr(args, "record", None)
+    replay = getattr(args, "replay", None)
+    if not (record or replay):
+        return
+
+    if replay:
+        CASSETTE = Player(replay, args.replay_latency)
+    else:
+        CASSETTE = Recorder(record if shard is None else f"{record}.shard-{shard}")
+
+    for session in sessions:
+        for prefix, adapter in list(session.adapters.items()):
+            mounted = CassetteAdapter(
+                CASSETTE,
+                pool_connections=getattr(adapter, "_pool_connections", 10),
+                pool_maxsize=getattr(adapter, "_pool_maxsize", 10),
+            )
+            session.mount(prefix, mounted)
+    atexit.register(finish)
+
+
+def finish():
+    """Close the cassette; worker processes must call this themselves since
+    they exit without running atexit handlers."""
+    global CASSETTE
+    if CASSETTE is not None:
+        CASSETTE.close()
+        CASSETTE = None
+
+
+def add_arguments(parser):
+    parser.add_argument("--record", metavar="FILE", help="record every HTTP exchange into this cassette")
+    parser.add_argument("--replay", metavar="FILE", help="answer HTTP requests from this cassette (offline)")
+    parser.add_argument(
+        "--replay-latency", choices=["recorded", "zero"], default="recorded",
+        help="replay with the recorded response times or instantly"
+    )
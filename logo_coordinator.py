@@ -0,0 +1,272 @@
+"""Coordinator / worker mode for running the favicon cascade on several
+machines.
+
+    python logo_coordinator.py serve --db queue.db a.csv b.csv
+    python logo_coordinator.py work --coordinator http://host:8765
+
+The coordinator keeps one row per product (domain + title) in SQLite and
+hands out batches under a lease; a batch whose lease runs out (crashed or
+stuck worker) is handed out again. Workers run fetch_logo_or_favicon from
+guaranteed_logo_favicon_downloader_v2 and report one result per product.
+Images go to <--logos-dir>/<worker name>/, one folder per worker, so
+workers pointed at the same shared storage never pick the same file name.
+"""
+import os
+import json
+import time
+import socket
+import sqlite3
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+from product_csv import read_products
+from logo_manifest import ResultCollector
+import logo_store
+import logo_sinks
+
+
+LEASE_SECONDS = 300
+BATCH_SIZE = 20
+# leases handed out per product before it is given up on
+MAX_ATTEMPTS = 3
+# how often an idle worker asks again while other workers hold leases
+POLL_SECONDS = 15
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    domain TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    state TEXT NOT NULL DEFAULT 'pending',
+    lease_owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    ok INTEGER,
+    result TEXT,
+    -- products sharing a domain each get their own logo file
+    UNIQUE (domain, title)
+);
+CREATE INDEX IF NOT EXISTS items_state ON items (state, lease_expires);
+"""
+
+
+# ================= COORDINATOR =================
+class WorkQueue:
+    def __init__(self, db_path):
+        self.db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    def load_csv(self, csv_path, get_domain):
+        added = 0
+        with self.lock:
+            self.db.execute("BEGIN")
+            for row in read_products(csv_path):
+                domain = get_domain(row.url)
+                if not domain:
+                    continue
+                cur = self.db.execute(
+                    "INSERT OR IGNORE INTO items (domain, title) VALUES (?, ?)",
+                    (domain, row.title or "")
+                )
+                added += cur.rowcount
+            self.db.execute("COMMIT")
+        return added
+
+    def lease(self, worker, n=BATCH_SIZE, seconds=LEASE_SECONDS):
+        now = time.time()
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            # expired leases that used up their attempts are given up on
+            self.db.execute(
+                "UPDATE items SET state = 'failed' WHERE state = 'leased' "
+                "AND lease_expires < ? AND attempts >= ?", (now, MAX_ATTEMPTS)
+            )
+            rows = self.db.execute(
+                "SELECT id, domain, title FROM items WHERE state = 'pending' "
+                "OR (state = 'leased' AND lease_expires < ?) ORDER BY id LIMIT ?",
+                (now, n)
+            ).fetchall()
+            self.db.executemany(
+                "UPDATE items SET state = 'leased', lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                [(worker, now + seconds, r[0]) for r in rows]
+            )
+            self.db.execute("COMMIT")
+        return [{"id": r[0], "domain": r[1], "title": r[2]} for r in rows]
+
+    def complete(self, worker, results):
+        with self.lock:
+            self.db.execute("BEGIN")
+            for r in results:
+                self.db.execute(
+                    "UPDATE items SET state = 'done', ok = ?, result = ?, lease_owner = ? "
+                    "WHERE id = ? AND state != 'done'",
+                    (1 if r.get("ok") else 0, json.dumps(r.get("record")), worker, r["id"])
+                )
+            self.db.execute("COMMIT")
+
+    def progress(self):
+        with self.lock:
+            rows = self.db.execute("SELECT state, COUNT(*), SUM(ok) FROM items GROUP BY state").fetchall()
+        counts = {state: n for state, n, _ in rows}
+        counts["found"] = sum(ok or 0 for _, _, ok in rows)
+        return counts
+
+
+def make_handler(work):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, payload, status=200):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_GET(self):
+            if self.path == "/progress":
+                self._send(work.progress())
+            else:
+                self._send({"error": "not found"}, 404)
+
+        def do_POST(self):
+            body = self._body()
+            if self.path == "/lease":
+                items = work.lease(body["worker"], body.get("n", BATCH_SIZE),
+                                   body.get("seconds", LEASE_SECONDS))
+                self._send({"items": items})
+            elif self.path == "/complete":
+                work.complete(body["worker"], body["results"])
+                self._send({"ok": True})
+            else:
+                self._send({"error": "not found"}, 404)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def serve(args):
+    from guaranteed_logo_favicon_downloader_v2 import get_domain
+
+    work = WorkQueue(args.db)
+    for csv_path in args.csv:
+        print(f"📥 {csv_path}: {work.load_csv(csv_path, get_domain)} new products")
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(work))
+    print(f"🛰️ Coordinator on http://{args.host}:{args.port}  {work.progress()}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"📊 {work.progress()}")
+
+
+# ================= WORKER =================
+def work_loop(args):
+    from guaranteed_logo_favicon_downloader_v2 import fetch_logo_or_favicon
+    from source_stats import SourceStats
+    import logo_sources
+
+    worker = args.worker or f"{socket.gethostname()}-{os.getpid()}"
+    # one folder (and source index) per worker: the name registry of one
+    # process can't see what another worker is about to write
+    logos_dir = os.path.join(args.logos_dir, worker)
+    os.makedirs(logos_dir, exist_ok=True)
+    stats = SourceStats(frozen=args.freeze_order)
+    index = logo_sources.SourceIndex(logos_dir)
+    logo_sinks.start(args)
+    if args.dedup:
+        logo_store.enable(args.dedup)
+    done = 0
+
+    while True:
+        try:
+            r = requests.post(f"{args.coordinator}/lease", timeout=30,
+                              json={"worker": worker, "n": args.batch})
+            items = r.json()["items"]
+        except Exception as e:
+            print(f"⚠️ Coordinator unreachable: {e}")
+            time.sleep(10)
+            continue
+
+        if not items:
+            # a crashed worker's batches come back once their lease runs out;
+            # stay around for them while anything is still leased
+            try:
+                leased = requests.get(f"{args.coordinator}/progress", timeout=30).json().get("leased", 0)
+            except Exception as e:
+                print(f"⚠️ Coordinator unreachable: {e}")
+                leased = 1
+            if not leased:
+                break
+            time.sleep(POLL_SECONDS)
+            continue
+
+        results = []
+        for item in items:
+            collector = ResultCollector()
+            ok = fetch_logo_or_favicon(item["domain"], item["title"], logos_dir,
+                                       stats, index, collector)
+            results.append({"id": item["id"], "ok": ok, "record": collector.last})
+
+        # keep results if the report fails; the lease will re-issue them anyway
+        try:
+            requests.post(f"{args.coordinator}/complete", timeout=30,
+                          json={"worker": worker, "results": results})
+        except Exception as e:
+            print(f"⚠️ Could not report batch: {e}")
+
+        done += len(results)
+        index.save()
+        print(f"📦 {worker}: {done} products done")
+
+    logo_sinks.finish()
+    stats.save()
+    index.save()
+    print(f"✅ {worker}: queue empty, {done} products processed")
+    if logo_store.summary():
+        print(f"♻️ Dedup: {logo_store.summary()}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Distribute the favicon cascade across machines")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    s = sub.add_parser("serve", help="load CSVs into the queue and hand out leases")
+    s.add_argument("csv", nargs="*", help="CSV files to add to the queue")
+    s.add_argument("--db", default="logo_queue.db")
+    s.add_argument("--host", default="0.0.0.0")
+    s.add_argument("--port", type=int, default=8765)
+
+    w = sub.add_parser("work", help="lease batches from a coordinator and process them")
+    w.add_argument("--coordinator", required=True, help="e.g. http://10.0.0.5:8765")
+    w.add_argument("--logos-dir", default="logos", help="images go to a subfolder per worker")
+    w.add_argument("--batch", type=int, default=BATCH_SIZE)
+    w.add_argument("--worker", help="worker name (default host-pid)")
+    w.add_argument("--freeze-order", action="store_true")
+    logo_store.add_arguments(w)
+    logo_sinks.add_arguments(w)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.mode == "serve":
+        serve(args)
+    else:
+        work_loop(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+"""Load harness: run the real download code against local stand-in servers.
+
+    python logo_loadtest.py --rows 10000 --scenario cascade --workers 32
+    python logo_loadtest.py --rows 1000 --scenario cascade --pipeline --stage-workers homepage=64
+    python logo_loadtest.py --rows 5000 --scenario providers --latency-ms 80 --rate-limit 0.05
+    python logo_loadtest.py --rows 2000 --scenario capterra --slow-rate 0.01 --oversize-rate 0.02
+
+Every request the shared SESSIONs make is answered by one local server that
+plays product homepages, /favicon.ico, the Google/DuckDuckGo/Clearbit/
+faviconkit icon APIs and paginated Capterra category listings, with faults
+injected at the given rates. Nothing leaves the machine.
+
+Scenarios:
+    cascade    guaranteed v2 fetch_logo_or_favicon (threads) or its --pipeline
+    providers  high-quality v2 download_high_quality_png over the icon APIs
+    capterra   listing pages parsed like --network-capture, matched rows get
+               the Capterra logo, the rest go through the v5 favicon cascade
+"""
+import io
+import os
+import sys
+import time
+import zlib
+import shutil
+import random
+import argparse
+import tempfile
+import threading
+from contextlib import redirect_stdout
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from requests.adapters import HTTPAdapter
+
+from product_csv import read_products
+import logo_trace
+
+
+HOST_HEADER = "X-Stand-In-Host"
+CAPTERRA_HOST = "www.capterra.in"
+CAPTERRA_CATEGORY = "/directory/30019/accounting/software"
+PAGE_SIZE = 25
+
+PROVIDER_HOSTS = [
+    "www.google.com", "s2.googleusercontent.com", "icons.duckduckgo.com",
+    "logo.clearbit.com", "api.faviconkit.com",
+]
+IMAGE_CDN = "gdm-catalog-fmapi-prod.imgix.net"
+
+# Share of product sites that have each asset (decided per domain, stable)
+HAS_LOGO_IMG = 0.6
+HAS_ICON_LINK = 0.8
+HAS_FAVICON_ICO = 0.7
+# Share of products that appear on the Capterra listing
+LISTED = 0.7
+
+
+def chance(host, what, share):
+    return zlib.crc32(f"{host}:{what}".encode()) % 1000 < share * 1000
+
+
+# ================= FIXTURES =================
+def make_image(size, fmt, noisy=False):
+    from PIL import Image
+    img = Image.new("RGBA", (size, size), (40, 120, 200, 255))
+    if noisy:
+        img = Image.frombytes("RGBA", (size, size), os.urandom(size * size * 4))
+    out = io.BytesIO()
+    if fmt == "ICO":
+        img.save(out, "ICO", sizes=[(min(size, 256), min(size, 256))])
+    else:
+        img.save(out, fmt)
+    return out.getvalue()
+
+
+def homepage_html(host):
+    head = ["<meta charset='utf-8'><title>Home</title>"]
+    head += [f"<link rel='preload' href='/static/{i}.js' as='script'>" for i in range(10)]
+    if chance(host, "icon", HAS_ICON_LINK):
+        head.append("<link rel='icon' href='/assets/icon-192.png'>")
+    body = []
+    if chance(host, "logo", HAS_LOGO_IMG):
+        body.append("<header><img class='logo' alt='Company logo' src='/assets/logo.png'></header>")
+    body += [f"<div class='card'><img src='/img/p{i}.jpg' alt='product {i}'><p>{'lorem ' * 30}</p></div>"
+             for i in range(40)]
+    return f"<html><head>{''.join(head)}</head><body>{''.join(body)}</body></html>".encode()
+
+
+def listing_html(titles, page):
+    start = (page - 1) * PAGE_SIZE
+    cards = []
+    for i, title in enumerate(titles[start:start + PAGE_SIZE], start):
+        cards.append(
+            f"<div class='card'><img data-src='https://{IMAGE_CDN}/ProductLogo/{i}.png' "
+            f"src='data:image/gif;base64,R0lGOD'><h2 class='h5'><a href='/p/{i}'>{title}</a></h2></div>"
+        )
+    nxt = ""
+    if start + PAGE_SIZE < len(titles):
+        nxt = f"<a rel='next' href='{CAPTERRA_CATEGORY}?page={page + 1}'>Next</a>"
+    return f"<html><body>{''.join(cards)}{nxt}</body></html>".encode()
+
+
+# ================= STAND-IN SERVER =================
+class Faults:
+    def __init__(self, args):
+        self.latency = args.latency_ms / 1000
+        self.error_rate = args.error_rate
+        self.rate_limit = args.rate_limit
+        self.slow_rate = args.slow_rate
+        self.slow_seconds = args.slow_seconds
+        self.oversize_rate = args.oversize_rate
+        self.rnd = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.counts = {"requests": 0, "errors": 0, "429": 0, "slow": 0, "oversize": 0}
+
+    def roll(self, rate, name):
+        with self.lock:
+            hit = self.rnd.random() < rate
+            if hit:
+                self.counts[name] += 1
+            return hit
+
+    def delay(self):
+        with self.lock:
+            self.counts["requests"] += 1
+            # exponential around the mean: mostly quick, a few slow ones
+            return self.rnd.expovariate(1 / self.latency) if self.latency else 0
+
+
+def make_server(faults, titles):
+    images = {
+        "png": make_image(64, "PNG"),
+        "ico": make_image(32, "ICO"),
+        "oversize": make_image(2048, "PNG", noisy=True),
+    }
+    listed = [t for t in titles if chance(t, "listed", LISTED)]
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status, body=b"", content_type="text/html", slow=False):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            if status == 429:
+                self.send_header("Retry-After", "1")
+            self.end_headers()
+            if not slow:
+                self.wfile.write(body)
+                return
+            # slow-loris: trickle the body out over slow_seconds
+            chunks = 20
+            step = max(1, len(body) // chunks)
+            for i in range(0, len(body), step):
+                self.wfile.write(body[i:i + step])
+                self.wfile.flush()
+                time.sleep(faults.slow_seconds / chunks)
+
+        def _image(self, kind):
+            if faults.roll(faults.oversize_rate, "oversize"):
+                return images["oversize"], "image/png"
+            if kind == "ico":
+                return images["ico"], "image/x-icon"
+            return images["png"], "image/png"
+
+        def do_GET(self):
+            host = self.headers.get(HOST_HEADER, "")
+            url = urlparse(self.path)
+            time.sleep(faults.delay())
+
+            if faults.roll(faults.error_rate, "errors"):
+                self._send(500, b"error")
+                return
+            if faults.roll(faults.rate_limit, "429"):
+                self._send(429, b"slow down")
+                return
+            slow = faults.roll(faults.slow_rate, "slow")
+
+            if host == CAPTERRA_HOST:
+                page = int(parse_qs(url.query).get("page", ["1"])[0])
+                self._send(200, listing_html(listed, page), slow=slow)
+            elif host in PROVIDER_HOSTS or host == IMAGE_CDN:
+                self._send(200, *self._image("png"), slow=slow)
+            elif url.path == "/":
+                self._send(200, homepage_html(host), slow=slow)
+            elif url.path == "/favicon.ico" and chance(host, "ico", HAS_FAVICON_ICO):
+                self._send(200, *self._image("ico"), slow=slow)
+            elif url.path.startswith("/assets/"):
+                self._send(200, *self._image("png"), slow=slow)
+            else:
+                self._send(404, b"not found")
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 1024
+
+    return Server(("127.0.0.1", 0), Handler)
+
+
+class StandInAdapter(HTTPAdapter):
+    """Sends every request to the local server, original host in a header."""
+
+    def __init__(self, port, **kwargs):
+        self.port = port
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        url = urlparse(request.url)
+        request.headers[HOST_HEADER] = url.netloc
+        request.url = f"http://127.0.0.1:{self.port}{url.path or '/'}" + (f"?{url.query}" if url.query else "")
+        return super().send(request, **kwargs)
+
+
+def route_sessions(port, sessions, pool_size):
+    for session in sessions:
+        adapter = StandInAdapter(port, pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+
+# ================= WORKLOAD =================
+class LatencyCollector:
+    """Manifest stand-in that keeps each row's latency and source."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.sources = {}
+
+    def write(self, **record):
+        with self.lock:
+            self.latencies.append(record.get("latency_ms") or 0)
+            source = record.get("source")
+            self.sources[source] = self.sources.get(source, 0) + 1
+
+
+def make_csv(path, rows):
+    import csv
+    titles = []
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["Handle", "Title", "product.metafields.custom.custom", "Product Category"])
+        for i in range(rows):
+            title = f"Product {i} Suite"
+            titles.append(title)
+            w.writerow([f"product-{i}", title, f"https://www.product{i}.test/", "Accounting"])
+    return titles
+
+
+def run_cascade(csv_path, logos_dir, args, collector):
+    import guaranteed_logo_favicon_downloader_v2 as g2
+    from source_stats import SourceStats
+    import logo_sources
+    from logo_pipeline import parse_workers
+
+    stats = SourceStats(os.path.join(logos_dir, ".stats.json"), frozen=True)
+    index = logo_sources.SourceIndex(logos_dir)
+    rows = ((g2.get_domain(r.url), r.title, logo_trace.row_key(n, r.title))
+            for n, r in enumerate(read_products(csv_path), 1))
+    # rows without a usable URL never reach the cascade (as in the downloader)
+    rows = (row for row in rows if row[0])
+
+    if args.pipeline:
+        workers = parse_workers(args.stage_workers, g2.PIPELINE_WORKERS)
+        for _ in g2.run_pipeline(rows, logos_dir, stats, index, collector, workers):
+            pass
+        return
+
+    def one(domain, title, key):
+        with logo_trace.row(key, domain=domain, title=title) as trace:
+            trace["ok"] = g2.fetch_logo_or_favicon(domain, title, logos_dir, stats, index, collector)
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for domain, title, key in rows:
+            pool.submit(one, domain, title, key)
+
+
+def run_providers(csv_path, logos_dir, args, collector):
+    import download_high_quality_logos_v2 as hq
+    from source_stats import SourceStats
+
+    stats = SourceStats(os.path.join(logos_dir, ".stats.json"), frozen=True)
+
+    def one(row):
+        start = time.time()
+        ok = hq.download_high_quality_png(hq.get_domain(row.url), row.title, row.category, logos_dir, stats)
+        collector.write(latency_ms=int((time.time() - start) * 1000), source="api" if ok else "not_found")
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for row in read_products(csv_path):
+            pool.submit(one, row)
+
+
+def run_capterra(csv_path, logos_dir, args, collector):
+    import capterra_logo_downloader_v5 as v5
+    import capterra_network
+
+    v5.MANIFEST = collector
+    pending = {v5.normalize(r.title): r for r in read_products(csv_path) if r.title}
+    page_url = f"https://{CAPTERRA_HOST}{CAPTERRA_CATEGORY}"
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        while page_url and pending:
+            try:
+                r = v5.SESSION.get(page_url, headers=v5.HEADERS, timeout=20)
+                products, page_url = capterra_network.products_from_html(r.text, page_url)
+            except Exception:
+                break
+            for name, img_url in products:
+                row = v5.match_pending(pending, name)
+                if row:
+                    pool.submit(v5.save_capterra_logo, row, img_url, logos_dir)
+
+        for row in pending.values():
+            pool.submit(v5.favicon_fallback, row, logos_dir)
+
+
+SCENARIOS = {"cascade": run_cascade, "providers": run_providers, "capterra": run_capterra}
+
+
+def peak_memory_mb():
+    """Peak RSS of this process and of finished children (pipeline process stages)."""
+    try:
+        import resource
+    except ImportError:
+        return None, None
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024  # bytes on macOS, KB elsewhere
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / divisor)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the pipeline against local stand-in servers")
+    parser.add_argument("--rows", type=int, default=1000, help="synthetic CSV size (1k-100k)")
+    parser.add_argument("--scenario", choices=list(SCENARIOS), default="cascade")
+    parser.add_argument("--workers", type=int, default=16, help="concurrent rows (thread pool)")
+    parser.add_argument("--pipeline", action="store_true", help="cascade: use the staged pipeline")
+    parser.add_argument("--stage-workers", help="cascade --pipeline: e.g. homepage=64,download=64")
+    parser.add_argument("--latency-ms", type=float, default=20, help="mean server latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 500 responses")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="share of 429 responses")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="share of slow-loris bodies")
+    parser.add_argument("--slow-seconds", type=float, default=5.0, help="how long a slow body takes")
+    parser.add_argument("--oversize-rate", type=float, default=0.0, help="share of images served at 2048px")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--keep", action="store_true", help="keep the work folder (CSV and logos)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    work_dir = tempfile.mkdtemp(prefix="logo_load_")
+    csv_path = os.path.join(work_dir, "products.csv")
+    logos_dir = os.path.join(work_dir, "logos")
+    os.makedirs(logos_dir)
+
+    titles = make_csv(csv_path, args.rows)
+    faults = Faults(args)
+    server = make_server(faults, titles)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    import capterra_logo_downloader_v5 as v5
+    import guaranteed_logo_favicon_downloader_v2 as g2
+    import download_high_quality_logos_v2 as hq
+    pool_size = max(args.workers, 64)
+    route_sessions(server.server_address[1], [v5.SESSION, g2.SESSION, hq.SESSION], pool_size)
+
+    print(f"🧪 {args.rows} rows, scenario {args.scenario}, stand-in server on port {server.server_address[1]}")
+    collector = LatencyCollector()
+    start = time.time()
+    with open(os.devnull, "w", encoding="utf-8") as devnull, redirect_stdout(devnull):
+        SCENARIOS[args.scenario](csv_path, logos_dir, args, collector)
+    elapsed = time.time() - start
+    server.shutdown()
+
+    lat = collector.latencies
+    own, children = peak_memory_mb()
+    print("\n" + "=" * 50)
+    print("📊 LOAD TEST")
+    print("=" * 50)
+    print(f"Rows finished   : {len(lat)} / {args.rows}")
+    print(f"Wall time       : {elapsed:.1f} s")
+    print(f"Rows/sec        : {len(lat) / elapsed:.1f}")
+    print(f"Row latency     : p50 {logo_trace.percentile(lat, 50):.0f} ms   p99 {logo_trace.percentile(lat, 99):.0f} ms")
+    print(f"Sources         : {', '.join(f'{k}={v}' for k, v in sorted(collector.sources.items(), key=str))}")
+    if own is not None:
+        print(f"Peak memory     : {own:.0f} MB (children {children:.0f} MB)")
+    print(f"Server          : {', '.join(f'{k}={v}' for k, v in faults.counts.items())}")
+    print("=" * 50)
+
+    if args.keep:
+        print(f"📁 Work folder kept: {work_dir}")
+    else:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
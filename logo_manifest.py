@@ -0,0 +1,105 @@
+import os
+import csv
+import json
+import time
+import hashlib
+import threading
+
+
+# "source" is one of capterra, html_logo, html_icon, favicon_ico, google,
+# not_found, no_domain or error, the same in every script
+FIELDS = [
+    "title", "domain", "source", "source_url", "bytes",
+    "width", "height", "sha256", "latency_ms", "path", "finished_at",
+]
+
+FORMATS = ["jsonl", "csv", "parquet"]
+
+# Parquet rows are buffered into row groups of this size
+PARQUET_BATCH = 1000
+
+
+def image_info(content, img=None):
+    """Byte count, content hash and (if already decoded) dimensions."""
+    info = {
+        "bytes": len(content),
+        "sha256": hashlib.sha256(content).hexdigest(),
+    }
+    if img is not None:
+        info["width"], info["height"] = img.size
+    return info
+
+
+class ResultCollector:
+    """Stands in for a ManifestWriter and keeps the last record written,
+    for callers that want one row's result rather than a file."""
+
+    def __init__(self):
+        self.last = None
+
+    def write(self, **record):
+        self.last = record
+
+
+class ManifestWriter:
+    """Appends one record per finished row, flushed as it goes, so
+    downstream jobs can read results without scanning the logos folder."""
+
+    def __init__(self, path, fmt=None):
+        self.path = path
+        self.fmt = fmt or os.path.splitext(path)[1].lstrip(".") or "jsonl"
+        if self.fmt not in FORMATS:
+            raise ValueError(f"Unknown manifest format: {self.fmt}")
+
+        self.lock = threading.Lock()
+        self.count = 0
+        self.batch = []
+        self.writer = None
+
+        if self.fmt == "parquet":
+            # optional dependency, only needed for this format
+            import pyarrow
+            import pyarrow.parquet
+            self.pa = pyarrow
+            self.pq = pyarrow.parquet
+            self.schema = pyarrow.schema(
+                [(f, pyarrow.int64()) if f in ("bytes", "width", "height", "latency_ms")
+                 else (f, pyarrow.string()) for f in FIELDS]
+            )
+            self.writer = self.pq.ParquetWriter(path, self.schema)
+        else:
+            self.file = open(path, "w", encoding="utf-8", newline="")
+            if self.fmt == "csv":
+                self.writer = csv.DictWriter(self.file, fieldnames=FIELDS, extrasaction="ignore")
+                self.writer.writeheader()
+
+    def write(self, **record):
+        record.setdefault("finished_at", time.strftime("%Y-%m-%dT%H:%M:%S"))
+        row = {f: record.get(f) for f in FIELDS}
+
+        with self.lock:
+            self.count += 1
+            if self.fmt == "jsonl":
+                self.file.write(json.dumps(row, ensure_ascii=False) + "\n")
+                self.file.flush()
+            elif self.fmt == "csv":
+                self.writer.writerow(row)
+                self.file.flush()
+            else:
+                self.batch.append(row)
+                if len(self.batch) >= PARQUET_BATCH:
+                    self._flush_parquet()
+
+    def _flush_parquet(self):
+        if self.batch:
+            table = self.pa.Table.from_pylist(self.batch, schema=self.schema)
+            self.writer.write_table(table)
+            self.batch = []
+
+    def close(self):
+        with self.lock:
+            if self.fmt == "parquet":
+                self._flush_parquet()
+                self.writer.close()
+            else:
+                self.file.close()
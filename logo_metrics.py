@@ -0,0 +1,260 @@
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import logo_trace
+
+
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 60)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _label_text(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels):
+        """Sum over every series carrying these labels (all series if none)."""
+        wanted = set(labels.items())
+        with self.lock:
+            return sum(v for key, v in self.values.items() if wanted <= set(key))
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_label_text(key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        # label key -> [bucket counts..., sum, count]
+        self.values = {}
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            v = self.values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            if i < len(self.buckets):
+                v[i] += 1
+            v[-2] += value
+            v[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for key, v in sorted(self.values.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, v):
+                    cumulative += n
+                    lines.append(f"{self.name}_bucket{_label_text(key, [('le', bound)])} {cumulative}")
+                lines.append(f"{self.name}_bucket{_label_text(key, [('le', '+Inf')])} {v[-1]}")
+                lines.append(f"{self.name}_sum{_label_text(key)} {round(v[-2], 6)}")
+                lines.append(f"{self.name}_count{_label_text(key)} {v[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def _get(self, cls, name, help_text, *args):
+        with self.lock:
+            if name not in self.metrics:
+                self.metrics[name] = cls(name, help_text, *args)
+            return self.metrics[name]
+
+    def counter(self, name, help_text):
+        return self._get(Counter, name, help_text)
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help_text, buckets)
+
+    def snapshot(self):
+        """Picklable copy of every series, for shipping out of a worker process."""
+        with self.lock:
+            metrics = list(self.metrics.values())
+        snap = {}
+        for metric in metrics:
+            with metric.lock:
+                snap[metric.name] = {k: list(v) if isinstance(v, list) else v
+                                     for k, v in metric.values.items()}
+        return snap
+
+    def merge(self, snap):
+        """Add a worker's snapshot into this registry's metrics."""
+        with self.lock:
+            metrics = dict(self.metrics)
+        for name, values in snap.items():
+            metric = metrics.get(name)
+            if metric is None:
+                continue
+            with metric.lock:
+                for key, v in values.items():
+                    if isinstance(v, list):
+                        mine = metric.values.setdefault(key, [0] * (len(v) - 2) + [0.0, 0])
+                        for i, n in enumerate(v):
+                            mine[i] += n
+                    else:
+                        metric.values[key] = metric.values.get(key, 0) + v
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """Atomic write for node_exporter's textfile collector."""
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+
+REGISTRY = Registry()
+
+# ================= SHARED METRICS =================
+INPUT_ROWS = REGISTRY.counter("logo_input_rows_total", "Rows read from the input CSV")
+ROWS = REGISTRY.counter("logo_rows_total", "Rows finished, by tier and source")
+STAGE_SECONDS = REGISTRY.histogram("logo_stage_seconds", "Time per pipeline stage / step")
+HTTP_SECONDS = REGISTRY.histogram("logo_http_seconds", "HTTP request latency by host")
+HTTP_REQUESTS = REGISTRY.counter("logo_http_requests_total", "HTTP requests by host and outcome")
+
+# hosts worth a label of their own; product sites all count as "site", or
+# a 100k-row run would export a series per domain
+PROVIDER_HOSTS = [
+    "capterra", "www.google.com", "s2.googleusercontent.com", "logo.clearbit.com",
+    "icons.duckduckgo.com", "api.faviconkit.com",
+]
+BYTES = REGISTRY.counter("logo_bytes_downloaded_total", "Response bytes downloaded")
+CACHE = REGISTRY.counter("logo_cache_requests_total", "Cache lookups by cache and result (hit/miss)")
+STORE_FILES = REGISTRY.counter("logo_store_files_total", "Images saved with --dedup, by result (new/duplicate)")
+STORE_BYTES = REGISTRY.counter("logo_store_bytes_total", "Bytes of images saved with --dedup, by result (new/duplicate)")
+
+
+def timed_get(session, url, **kwargs):
+    """session.get() that records latency, outcome and bytes per
+    host_label() (and trace spans when --trace is on)."""
+    host = host_label(url)
+    start = time.perf_counter()
+    try:
+        r = logo_trace.traced_get(session, url, **kwargs)
+    except Exception:
+        HTTP_SECONDS.observe(time.perf_counter() - start, host=host)
+        HTTP_REQUESTS.inc(host=host, outcome="error")
+        raise
+    HTTP_SECONDS.observe(time.perf_counter() - start, host=host)
+    HTTP_REQUESTS.inc(host=host, outcome=str(r.status_code))
+    BYTES.inc(len(r.content or b""))
+    return r
+
+
+def host_label(url):
+    host = urlparse(url).hostname or ""
+    for provider in PROVIDER_HOSTS:
+        if host == provider or provider in host.split("."):
+            return provider
+    return "site"
+
+
+def cache_hit_ratio(cache):
+    hits = CACHE.value(cache=cache, result="hit")
+    total = hits + CACHE.value(cache=cache, result="miss")
+    return hits / total if total else 0.0
+
+
+# ================= EXPORT =================
+def start_textfile_writer(path, interval=15):
+    """Rewrite the Prometheus textfile every `interval` seconds during a run;
+    call REGISTRY.write_textfile(path) once more at the end."""
+    def loop():
+        while True:
+            try:
+                REGISTRY.write_textfile(path)
+            except OSError:
+                pass
+            time.sleep(interval)
+
+    threading.Thread(target=loop, daemon=True).start()
+
+
+def serve_metrics(port, host="127.0.0.1"):
+    """Local /metrics endpoint on a background thread."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = REGISTRY.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_arguments(parser):
+    parser.add_argument("--metrics-file", help="write Prometheus metrics to this textfile during the run")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on localhost:PORT/metrics")
+
+
+def start_export(args):
+    if getattr(args, "metrics_file", None):
+        start_textfile_writer(args.metrics_file)
+    if getattr(args, "metrics_port", None):
+        serve_metrics(args.metrics_port)
+        print(f"📈 Metrics on http://127.0.0.1:{args.metrics_port}/metrics")
+
+
+def finish_export(args):
+    if getattr(args, "metrics_file", None):
+        REGISTRY.write_textfile(args.metrics_file)
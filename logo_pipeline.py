@@ -0,0 +1,257 @@
+import time
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from logo_metrics import STAGE_SECONDS
+import logo_profile
+
+
+THREAD = "thread"
+PROCESS = "process"
+
+# queue marker telling a worker the run is finished
+STOP = object()
+
+
+class Again:
+    """Returned by a stage to send `item` back to the earlier stage named
+    `stage` (e.g. a failed transcode back to download for the next URL)."""
+
+    def __init__(self, stage, item):
+        self.stage = stage
+        self.item = item
+
+
+class StageQueue(queue.Queue):
+    def put_back(self, item):
+        """put() that ignores maxsize. An item sent back must never wait on
+        the stages it would unblock, or a full loop of queues deadlocks."""
+        with self.not_full:
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+
+class Stage:
+    """One step of the pipeline.
+
+    `func(item)` returns the item for the next stage, or None to drop it.
+    THREAD stages run `func` directly in `workers` threads (I/O work);
+    PROCESS stages hand each item to a process pool of the same size
+    (CPU work that holds the GIL, e.g. Pillow), so `func` and the items
+    must be picklable.
+    """
+
+    def __init__(self, name, func, workers=1, kind=THREAD, queue_size=None):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.kind = kind
+        self.queue_size = queue_size
+
+
+class StageMetrics:
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.items_in = 0
+        self.items_out = 0
+        self.dropped = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.max_latency = 0.0
+        self.waited = 0.0
+        self.max_depth = 0
+
+    def record(self, seconds, result, error=False):
+        STAGE_SECONDS.observe(seconds, stage=self.name)
+        with self.lock:
+            self.items_in += 1
+            self.busy += seconds
+            self.max_latency = max(self.max_latency, seconds)
+            if error:
+                self.errors += 1
+            elif result is None:
+                self.dropped += 1
+            else:
+                self.items_out += 1
+
+    def snapshot(self):
+        with self.lock:
+            done = self.items_in or 1
+            return {
+                "stage": self.name,
+                "in": self.items_in,
+                "out": self.items_out,
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "avg_ms": round(self.busy / done * 1000, 1),
+                "max_ms": round(self.max_latency * 1000, 1),
+                "avg_wait_ms": round(self.waited / done * 1000, 1),
+                "max_queue": self.max_depth,
+            }
+
+
+class Pipeline:
+    """Bounded queues between stages give backpressure: a slow stage fills
+    its input queue and blocks the stage (or producer) feeding it.
+
+    An item whose stage raises is dropped, unless `on_error(item, error)`
+    is given: its return value goes straight to the output, so callers
+    still see (and count) the item. A stage may return Again(...) to send
+    an item back upstream, so the run ends when every fed item has left
+    the pipeline (output, dropped or failed), not when the first stage's
+    input runs out."""
+
+    def __init__(self, stages, queue_size=100, on_error=None):
+        self.stages = stages
+        self.on_error = on_error
+        self.queues = [StageQueue(maxsize=s.queue_size or queue_size) for s in stages]
+        self.output = queue.Queue(maxsize=queue_size)
+        self.metrics = [StageMetrics(s.name) for s in stages]
+        self.pools = {}
+        self.threads = []
+        self.lock = threading.Lock()
+        self.fed = 0
+        self.settled = 0
+        self.fed_all = False
+
+    def _put(self, i, item):
+        q = self.queues[i] if i < len(self.stages) else self.output
+        q.put(item)
+        if i < len(self.stages):
+            m = self.metrics[i]
+            with m.lock:
+                m.max_depth = max(m.max_depth, q.qsize())
+
+    def _worker(self, i):
+        stage = self.stages[i]
+        metrics = self.metrics[i]
+        pool = self.pools.get(i)
+
+        while True:
+            wait_start = time.time()
+            item = self.queues[i].get()
+            with metrics.lock:
+                metrics.waited += time.time() - wait_start
+
+            if item is STOP:
+                break
+
+            moved_on = False
+            try:
+                result = self._run(stage, metrics, pool, item)
+                if isinstance(result, Again):
+                    target = [s.name for s in self.stages].index(result.stage)
+                    self.queues[target].put_back(result.item)
+                    moved_on = True
+                elif result is not None:
+                    self._put(i + 1, result)
+                    moved_on = i + 1 < len(self.stages)
+            except Exception as e:
+                print(f"⚠️ {stage.name} lost an item: {e}")
+            finally:
+                # an item that left the pipeline, whichever way
+                if not moved_on:
+                    self._settle()
+
+    def _run(self, stage, metrics, pool, item):
+        """The stage's result for `item`; on_error's (or None) if it raised."""
+        start = time.time()
+        try:
+            with logo_profile.stage(stage.name):
+                if pool:
+                    result = pool.submit(stage.func, item).result()
+                else:
+                    result = stage.func(item)
+            metrics.record(time.time() - start, result)
+            return result
+        except Exception as e:
+            print(f"⚠️ {stage.name} failed: {e}")
+            metrics.record(time.time() - start, None, error=True)
+            if not self.on_error:
+                return None
+            try:
+                self.output.put(self.on_error(item, e))
+            except Exception as hook_error:
+                print(f"⚠️ on_error failed too: {hook_error}")
+            return None
+
+    def _settle(self):
+        with self.lock:
+            self.settled += 1
+            done = self.fed_all and self.settled == self.fed
+        if done:
+            self._stop()
+
+    def _stop(self):
+        # nothing is left in any queue, so none of these puts can block
+        for q, stage in zip(self.queues, self.stages):
+            for _ in range(stage.workers):
+                q.put_back(STOP)
+        self.output.put(STOP)
+
+    def _feed(self, items):
+        try:
+            for item in items:
+                with self.lock:
+                    self.fed += 1
+                self._put(0, item)
+        finally:
+            with self.lock:
+                self.fed_all = True
+                done = self.settled == self.fed
+            if done:
+                self._stop()
+
+    def run(self, items):
+        """Feed `items` through all stages and yield what the last stage
+        returns, in completion order."""
+        for i, stage in enumerate(self.stages):
+            if stage.kind == PROCESS:
+                self.pools[i] = ProcessPoolExecutor(max_workers=stage.workers)
+            for _ in range(stage.workers):
+                t = threading.Thread(target=self._worker, args=(i,), daemon=True)
+                t.start()
+                self.threads.append(t)
+
+        feeder = threading.Thread(target=self._feed, args=(items,), daemon=True)
+        feeder.start()
+
+        done = False
+        try:
+            while True:
+                item = self.output.get()
+                if item is STOP:
+                    break
+                yield item
+            done = True
+        finally:
+            # if the consumer stopped early the daemon workers are left blocked
+            if done:
+                feeder.join()
+                for t in self.threads:
+                    t.join()
+            for pool in self.pools.values():
+                pool.shutdown(wait=done)
+
+    def report(self):
+        print("\n" + "-" * 86)
+        print(f"{'stage':<14}{'in':>8}{'out':>8}{'drop':>7}{'err':>6}"
+              f"{'avg ms':>10}{'max ms':>10}{'wait ms':>10}{'max q':>8}")
+        for m in self.metrics:
+            s = m.snapshot()
+            print(f"{s['stage']:<14}{s['in']:>8}{s['out']:>8}{s['dropped']:>7}{s['errors']:>6}"
+                  f"{s['avg_ms']:>10}{s['max_ms']:>10}{s['avg_wait_ms']:>10}{s['max_queue']:>8}")
+        print("-" * 86)
+
+
+def parse_workers(spec, defaults):
+    """Parse "fetch=16,transcode=4" on top of the default worker counts."""
+    workers = dict(defaults)
+    for part in (spec or "").split(","):
+        if "=" in part:
+            name, n = part.split("=", 1)
+            workers[name.strip()] = max(1, int(n))
+    return workers
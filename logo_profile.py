@@ -0,0 +1,169 @@
+"""--profile DIR: CPU profile of a whole run, split by stage.
+
+Writes into DIR when the process exits:
+    <stage>.prof       cProfile stats (pstats / snakeviz), threads merged
+    <stage>.txt        top functions by cumulative time
+    stacks.collapsed   sampled stacks, "stage;outer;...;inner count" per line,
+                       ready for flamegraph.pl or speedscope
+
+Stages are the pipeline stages, logo_batch tasks and the named blocks in the
+scripts (crawl_page, lookup, html_icon, parse, ...). Code outside any stage
+counts as "main".
+"""
+import os
+import sys
+import atexit
+import pstats
+import cProfile
+import threading
+from contextlib import contextmanager
+from collections import Counter
+
+
+SAMPLE_INTERVAL = 0.005
+TOP_FUNCTIONS = 40
+
+PROFILER = None
+LOCAL = threading.local()
+
+
+class RunProfiler:
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        os.makedirs(out_dir, exist_ok=True)
+        self.lock = threading.Lock()
+        self.profiles = {}           # (stage, thread id) -> cProfile.Profile
+        self.current = {}            # thread id -> innermost stage name
+        self.samples = Counter()
+        self.stopped = threading.Event()
+        self.main_thread = threading.get_ident()
+        self.sampler = threading.Thread(target=self._sample, daemon=True)
+
+    def profile_for(self, name):
+        key = (name, threading.get_ident())
+        with self.lock:
+            if key not in self.profiles:
+                self.profiles[key] = cProfile.Profile()
+            return self.profiles[key]
+
+    # ---------- sampling ----------
+    def _sample(self):
+        me = threading.get_ident()
+        while not self.stopped.wait(SAMPLE_INTERVAL):
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                stage = self.current.get(tid)
+                if stage is None and tid != self.main_thread:
+                    continue  # idle pool threads
+                self.samples[collapse(stage or "main", frame)] += 1
+
+    # ---------- output ----------
+    def write(self):
+        self.stopped.set()
+        self.sampler.join()
+        by_stage = {}
+        with self.lock:
+            for (name, _), profile in self.profiles.items():
+                by_stage.setdefault(name, []).append(profile)
+
+        for name, profiles in by_stage.items():
+            try:
+                stats = pstats.Stats(profiles[0])
+                for profile in profiles[1:]:
+                    stats.add(profile)
+            except TypeError:
+                continue  # stage never ran long enough to collect anything
+            stats.dump_stats(os.path.join(self.out_dir, f"{name}.prof"))
+            with open(os.path.join(self.out_dir, f"{name}.txt"), "w", encoding="utf-8") as f:
+                stats.stream = f
+                stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+
+        with open(os.path.join(self.out_dir, "stacks.collapsed"), "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        print(f"🔬 Profile written to {self.out_dir} ({len(by_stage)} stages, "
+              f"{sum(self.samples.values())} samples)")
+
+
+def collapse(stage, frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    names.append(stage)
+    return ";".join(n.replace(";", ":") for n in reversed(names))
+
+
+def _switch(old, new):
+    """Hand the thread's profiler from `old` to `new` (either may be None).
+    On Pythons where cProfile is process-wide (3.12+) only the first enable
+    succeeds; the sampler still attributes those stages."""
+    if old is not None:
+        old.disable()
+    if new is not None:
+        try:
+            new.enable()
+        except ValueError:
+            pass
+
+
+@contextmanager
+def stage(name):
+    profiler = PROFILER
+    if profiler is None:
+        yield
+        return
+
+    tid = threading.get_ident()
+    stack = getattr(LOCAL, "stack", None)
+    if stack is None:
+        stack = LOCAL.stack = []
+    previous = stack[-1] if stack else (None, None)
+
+    profile = profiler.profile_for(name)
+    _switch(previous[1], profile)
+    stack.append((name, profile))
+    profiler.current[tid] = name
+    try:
+        yield
+    finally:
+        stack.pop()
+        _switch(profile, previous[1])
+        if previous[0] is None:
+            profiler.current.pop(tid, None)
+        else:
+            profiler.current[tid] = previous[0]
+
+
+def enable(out_dir):
+    """Start profiling the calling (main) thread as stage "main"; outputs
+    are written at interpreter exit."""
+    global PROFILER
+    if PROFILER is not None:
+        return
+    PROFILER = RunProfiler(out_dir)
+    profile = PROFILER.profile_for("main")
+    LOCAL.stack = [("main", profile)]
+    _switch(None, profile)
+    PROFILER.sampler.start()
+    atexit.register(finish)
+
+
+def finish():
+    global PROFILER
+    if PROFILER is None:
+        return
+    for _, profile in getattr(LOCAL, "stack", []):
+        profile.disable()
+    LOCAL.stack = []
+    PROFILER.write()
+    PROFILER = None
+
+
+def add_arguments(parser):
+    parser.add_argument(
+        "--profile", metavar="DIR",
+        help="profile the run: per-stage cProfile output and sampled stacks (flame graph) in DIR"
+    )
@@ -0,0 +1,293 @@
+"""Local logo daemon.
+
+    python logo_service.py --port 8780 [--browser]
+
+    GET  /logo?domain=acme.com[&title=Acme][&format=png]
+    POST /batch  {"domains": ["acme.com", ...]}  or  {"items": [{"domain": ..., "title": ...}]}
+    GET  /health
+    GET  /metrics   (Prometheus text format)
+
+Lookups run the guaranteed v2 cascade (fetch_logo_or_favicon) and fall
+back to the favicon APIs of download_high_quality_png. HTTP pools, source
+stats and results stay warm between requests, and concurrent requests for
+the same domain share one fetch.
+"""
+import os
+import json
+import time
+import argparse
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor, Future
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import guaranteed_logo_favicon_downloader_v2 as cascade
+import download_high_quality_logos_v2 as apis
+from source_stats import SourceStats
+from logo_manifest import ResultCollector
+import logo_sources
+import logo_metrics
+import output_names
+from logo_metrics import CACHE, ROWS
+
+
+# Negative results are retried after this long; found logos are kept
+# as long as their file exists.
+NOT_FOUND_TTL = 3600
+# Results kept in memory; the least recently used go first (found logos
+# are still answered from disk after that)
+MAX_RESULTS = 50000
+
+
+class LogoService:
+    def __init__(self, cache_dir, workers=16, browser=None, max_results=MAX_RESULTS):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.stats = SourceStats()
+        self.index = logo_sources.SourceIndex(cache_dir)
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.browser = browser
+
+        self.lock = threading.Lock()
+        self.results = OrderedDict()
+        self.max_results = max_results
+        self.inflight = {}
+        self.served = {"hits": 0, "fetches": 0, "coalesced": 0}
+
+    def _cached(self, domain):
+        result = self.results.get(domain)
+        if not result:
+            return None
+        if (result["ok"] and os.path.exists(result["path"])) or \
+                (not result["ok"] and time.time() - result["at"] < NOT_FOUND_TTL):
+            self.results.move_to_end(domain)
+            return result
+        del self.results[domain]
+        return None
+
+    def lookup(self, domain, title=""):
+        """Returns the result dict for `domain`, fetching it at most once
+        no matter how many callers ask at the same time."""
+        with self.lock:
+            cached = self._cached(domain)
+            if cached:
+                self.served["hits"] += 1
+                CACHE.inc(cache="service_results", result="hit")
+                return cached
+            CACHE.inc(cache="service_results", result="miss")
+
+            future = self.inflight.get(domain)
+            owner = future is None
+            if owner:
+                self.served["fetches"] += 1
+                future = Future()
+                self.inflight[domain] = future
+            else:
+                self.served["coalesced"] += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            result = self._fetch(domain, title)
+        except Exception as e:
+            with self.lock:
+                self.inflight.pop(domain, None)
+            future.set_exception(e)
+            raise
+
+        with self.lock:
+            self.results[domain] = result
+            self.results.move_to_end(domain)
+            while len(self.results) > self.max_results:
+                self.results.popitem(last=False)
+            self.inflight.pop(domain, None)
+        future.set_result(result)
+        return result
+
+    def _fetch(self, domain, title):
+        start = time.time()
+        file_base = cascade.filename_from_title_or_domain("", domain)
+        path = os.path.join(self.cache_dir, file_base + ".png")
+
+        # a file from an earlier service run is as good as a fresh fetch
+        # (not an empty name claim left by a crash)
+        if output_names.looks_like_image(path):
+            return {"ok": True, "domain": domain, "path": path, "source": "disk", "at": time.time()}
+
+        if self.browser and title:
+            img_url = self.browser.lookup(title)
+            if img_url and cascade.download_image(img_url, path, self.index):
+                ROWS.inc(tier="capterra", source="capterra")
+                return self._result(domain, path, "capterra", start)
+
+        collector = ResultCollector()
+        if cascade.fetch_logo_or_favicon(domain, "", self.cache_dir, self.stats, self.index, collector,
+                                         count_miss=False):
+            return self._result(domain, collector.last.get("path") or path, collector.last["source"], start)
+
+        if apis.download_high_quality_png(domain, "", "", self.cache_dir, self.stats, self.index):
+            return self._result(domain, path, "favicon_api", start)
+
+        return {"ok": False, "domain": domain, "source": "not_found", "at": time.time(),
+                "latency_ms": int((time.time() - start) * 1000)}
+
+    def _result(self, domain, path, source, start):
+        return {"ok": True, "domain": domain, "path": path, "source": source, "at": time.time(),
+                "latency_ms": int((time.time() - start) * 1000)}
+
+    def lookup_many(self, items):
+        futures = [self.pool.submit(self.lookup, d, t) for d, t in items]
+        results = []
+        for (domain, _), f in zip(items, futures):
+            try:
+                results.append(f.result())
+            except Exception as e:
+                results.append({"ok": False, "domain": domain, "error": str(e)})
+        return results
+
+    def save(self):
+        self.stats.save()
+        self.index.save()
+
+
+class WarmBrowser:
+    """One Chrome kept open for Capterra searches; searches are serialized."""
+
+    def __init__(self, origin, driver_path=None):
+        import capterra_logo_downloader_v5 as v5
+        self.v5 = v5
+        self.origin = origin
+        self.lock = threading.Lock()
+        self.driver, self.wait = v5.make_driver(True, driver_path)
+
+    def lookup(self, title):
+        with self.lock:
+            try:
+                return self.v5.lookup_product(self.driver, self.wait, self.origin, title)
+            except:
+                return None
+
+    def quit(self):
+        self.driver.quit()
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def _send_json(self, payload, status=200):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+            if url.path == "/health":
+                self._send_json({"ok": True, **service.served,
+                                 "hit_ratio": round(logo_metrics.cache_hit_ratio("service_results"), 3)})
+                return
+
+            if url.path == "/metrics":
+                body = logo_metrics.REGISTRY.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+
+            if url.path != "/logo":
+                self._send_json({"error": "not found"}, 404)
+                return
+
+            domain = cascade.get_domain(query.get("domain", ""))
+            if not domain:
+                self._send_json({"error": "missing or invalid domain"}, 400)
+                return
+
+            try:
+                result = service.lookup(domain, query.get("title", ""))
+            except Exception as e:
+                self._send_json({"ok": False, "domain": domain, "error": str(e)}, 500)
+                return
+            if query.get("format") != "png":
+                self._send_json(result, 200 if result["ok"] else 404)
+                return
+
+            if not result["ok"]:
+                self.send_response(404)
+                self.end_headers()
+                return
+            try:
+                with open(result["path"], "rb") as f:
+                    body = f.read()
+            except OSError as e:
+                self._send_json({"ok": False, "domain": domain, "error": str(e)}, 500)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if self.path != "/batch":
+                self._send_json({"error": "not found"}, 404)
+                return
+
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            items = [(d, "") for d in body.get("domains", [])]
+            items += [(i.get("domain", ""), i.get("title", "")) for i in body.get("items", [])]
+
+            valid = [(cascade.get_domain(d), t) for d, t in items]
+            results = service.lookup_many([(d, t) for d, t in valid if d])
+            self._send_json({"results": results})
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve logos on demand over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8780)
+    parser.add_argument("--cache-dir", default="service_logos")
+    parser.add_argument("--workers", type=int, default=16, help="parallel lookups per batch")
+    parser.add_argument(
+        "--max-results", type=int, default=MAX_RESULTS,
+        help="lookup results kept in memory (least recently used dropped first)"
+    )
+    parser.add_argument("--browser", action="store_true", help="keep Chrome open for Capterra search")
+    parser.add_argument("--capterra-origin", default="https://www.capterra.in")
+    parser.add_argument("--chromedriver", help="explicit chromedriver path (also $CHROMEDRIVER)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    browser = WarmBrowser(args.capterra_origin, args.chromedriver) if args.browser else None
+    service = LogoService(args.cache_dir, args.workers, browser, args.max_results)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+
+    print(f"🛰️ Logo service on http://{args.host}:{args.port}  (cache: {args.cache_dir})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.save()
+        if browser:
+            browser.quit()
+
+
+if __name__ == "__main__":
+    main()
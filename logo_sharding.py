@@ -0,0 +1,76 @@
+import os
+import json
+import shutil
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+from logo_sources import SOURCES_FILE
+
+
+MANIFEST_PART = "manifest.part.jsonl"
+
+
+def shard_of(domain, shards):
+    """Stable shard number for a domain, so every row of the same domain
+    lands in the same worker and per-domain dedup still works."""
+    digest = hashlib.blake2b(domain.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % shards
+
+
+def shard_dir(logos_dir, shard):
+    return os.path.join(logos_dir, f".shard-{shard}")
+
+
+def run_shards(worker, jobs, processes):
+    """Run `worker(job)` for every job in its own process and return the
+    results sorted by the shard number each result starts with."""
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        results = list(pool.map(worker, jobs))
+    return sorted(results, key=lambda r: r[0])
+
+
+def merge_shard_dirs(logos_dir, shards, allocate, index=None, manifest=None, move=os.replace):
+    """Move every shard's images into `logos_dir` in a fixed order (shard
+    number, then file name). `allocate(stem)` returns the final free path,
+    `move(src, path)` puts a file there (the run's output sink). The stem
+    is the one the row asked for, as kept in the shard's source index, so
+    a name suffixed inside a shard isn't suffixed again. Source-index
+    entries and manifest records follow their files."""
+    moved = 0
+    for shard in range(shards):
+        src_dir = shard_dir(logos_dir, shard)
+        if not os.path.isdir(src_dir):
+            continue
+
+        entries = {}
+        try:
+            with open(os.path.join(src_dir, SOURCES_FILE), encoding="utf-8") as f:
+                entries = json.load(f)
+        except:
+            pass
+
+        renamed = {}
+        for name in sorted(os.listdir(src_dir)):
+            if name.startswith(".") or name == MANIFEST_PART:
+                continue
+            stem = entries.get(name, {}).get("stem") or os.path.splitext(name)[0]
+            final_path = allocate(stem)
+            move(os.path.join(src_dir, name), final_path)
+            renamed[os.path.join(src_dir, name)] = final_path
+            moved += 1
+
+            if index is not None and name in entries:
+                with index.lock:
+                    index.entries[os.path.basename(final_path)] = entries[name]
+
+        part = os.path.join(src_dir, MANIFEST_PART)
+        if manifest is not None and os.path.exists(part):
+            with open(part, encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    if record.get("path"):
+                        record["path"] = renamed.get(record["path"], record["path"])
+                    manifest.write(**record)
+
+        shutil.rmtree(src_dir, ignore_errors=True)
+    return moved
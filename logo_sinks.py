@@ -0,0 +1,267 @@
+"""--sink: where saved logos end up.
+
+    dir       logos/<name>.png (default)
+    sharded   logos/<2 hex>/<name>.png, the prefix a hash of the name, so no
+              folder holds more than ~1/256 of a large run
+    tar, zip  one archive next to the logos folder (logos.tar, logos-1.tar, ...)
+              that images are appended to as they finish
+
+Folder sinks write every file to a temp name and rename it into place, so
+a crash never leaves a half-written PNG under a real name. --fsync-every N
+makes that durable without an fsync per file: temp files are collected and,
+every N files, fsynced, renamed and their folders fsynced in one go. Until
+its batch is flushed a file is not visible under its real name. It can't
+be combined with --dedup, whose store writes outside the sink.
+"""
+import os
+import io
+import time
+import atexit
+import hashlib
+import itertools
+import tarfile
+import zipfile
+import threading
+
+
+SINKS = ["dir", "sharded", "tar", "zip"]
+
+# set by start(); folders without a configured sink get a plain DirectorySink
+KIND = "dir"
+FSYNC_EVERY = 0
+SINK_FOLDERS = {}
+SINKS_LOCK = threading.Lock()
+TEMP_IDS = itertools.count()
+
+
+class DirectorySink:
+    def __init__(self, folder, fsync_every=0):
+        self.folder = folder
+        self.fsync_every = fsync_every
+        self.lock = threading.Lock()
+        self.batch = []  # (temp path, final path) waiting for the next fsync
+
+    def target(self, path):
+        return path
+
+    def claim(self, path):
+        """Reserve a name on disk (empty placeholder, replaced when the file
+        is written); False if the name already exists."""
+        try:
+            os.close(os.open(self.target(path), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            return False
+
+    def unclaim(self, path):
+        target = self.target(path)
+        try:
+            if os.path.getsize(target) == 0:
+                os.unlink(target)
+        except OSError:
+            pass
+
+    def write(self, path, data):
+        target = self.target(path)
+        tmp = temp_name(target)
+        with open(tmp, "wb") as f:
+            f.write(data)
+        self._commit(tmp, target)
+        return target
+
+    def move(self, src, path):
+        """Take over a finished file (shard merge)."""
+        target = self.target(path)
+        self._commit(src, target)
+        return target
+
+    def _commit(self, tmp, target):
+        if not self.fsync_every:
+            os.replace(tmp, target)
+            return
+        with self.lock:
+            self.batch.append((tmp, target))
+            if len(self.batch) < self.fsync_every:
+                return
+            batch, self.batch = self.batch, []
+        flush(batch)
+
+    def close(self):
+        with self.lock:
+            batch, self.batch = self.batch, []
+        flush(batch)
+
+
+class ShardedDirectorySink(DirectorySink):
+    def target(self, path):
+        folder, name = os.path.split(path)
+        prefix = hashlib.blake2b(os.path.normcase(name).encode("utf-8"), digest_size=1).hexdigest()
+        os.makedirs(os.path.join(folder, prefix), exist_ok=True)
+        return os.path.join(folder, prefix, name)
+
+
+class ArchiveSink:
+    def __init__(self, folder, kind, fsync_every=0):
+        self.folder = folder
+        self.lock = threading.Lock()
+        self.count = 0
+        self.fsync_every = fsync_every
+        # never overwrite the archive of an earlier run
+        base = os.path.abspath(folder)
+        i = 0
+        while True:
+            self.path = f"{base}.{kind}" if i == 0 else f"{base}-{i}.{kind}"
+            try:
+                self.file = open(self.path, "xb")
+                break
+            except FileExistsError:
+                i += 1
+        if kind == "tar":
+            self.archive = tarfile.open(fileobj=self.file, mode="w|")  # stream: nothing is seeked back to
+        else:
+            # PNGs are compressed already
+            self.archive = zipfile.ZipFile(self.file, "w", zipfile.ZIP_STORED)
+        print(f"🗜️ Images go to {self.path}")
+
+    def target(self, path):
+        return path
+
+    # names live only in the archive, which has a single writer
+    def claim(self, path):
+        return True
+
+    def unclaim(self, path):
+        pass
+
+    def write(self, path, data):
+        name = os.path.relpath(path, self.folder).replace(os.sep, "/")
+        with self.lock:
+            if isinstance(self.archive, tarfile.TarFile):
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                info.mtime = time.time()
+                self.archive.addfile(info, io.BytesIO(data))
+            else:
+                self.archive.writestr(zipfile.ZipInfo(name, time.localtime()[:6]), data)
+            self.count += 1
+            if self.fsync_every and self.count % self.fsync_every == 0:
+                # the tar stream holds back its last partial record; everything before it is synced
+                self.file.flush()
+                os.fsync(self.file.fileno())
+        return path
+
+    def move(self, src, path):
+        with open(src, "rb") as f:
+            data = f.read()
+        self.write(path, data)
+        os.unlink(src)
+        return path
+
+    def close(self):
+        with self.lock:
+            self.archive.close()
+            self.file.flush()
+            if self.fsync_every:
+                os.fsync(self.file.fileno())
+            self.file.close()
+        print(f"🗜️ {self.count} images in {self.path}")
+
+
+def temp_name(path):
+    """A temp name next to `path` that no other write of this process uses,
+    even one to the same name waiting in the same fsync batch."""
+    return f"{path}.{os.getpid()}.{next(TEMP_IDS)}.tmp"
+
+
+def flush(batch):
+    """fsync every temp file, rename it into place, then fsync the folders
+    the renames happened in. A temp file that has gone missing is skipped
+    so it can't strand the rest of the batch."""
+    if not batch:
+        return
+    for tmp, _ in batch:
+        try:
+            fd = os.open(tmp, os.O_RDONLY)
+        except FileNotFoundError:
+            continue
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    folders = set()
+    for tmp, target in batch:
+        try:
+            os.replace(tmp, target)
+        except FileNotFoundError:
+            print(f"⚠️ Temp file vanished before rename: {tmp}")
+            continue
+        folders.add(os.path.dirname(target) or ".")
+    if os.name == "posix":  # folders can't be opened for fsync on Windows
+        for folder in folders:
+            fd = os.open(folder, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+
+def sink_for(folder):
+    key = os.path.abspath(folder)
+    with SINKS_LOCK:
+        if key not in SINK_FOLDERS:
+            if KIND == "sharded":
+                SINK_FOLDERS[key] = ShardedDirectorySink(folder, FSYNC_EVERY)
+            elif KIND in ("tar", "zip"):
+                SINK_FOLDERS[key] = ArchiveSink(folder, KIND, FSYNC_EVERY)
+            else:
+                SINK_FOLDERS[key] = DirectorySink(folder, FSYNC_EVERY)
+        return SINK_FOLDERS[key]
+
+
+def target(path):
+    """Where a file saved as `path` actually lives on disk."""
+    return sink_for(os.path.dirname(path)).target(path)
+
+
+def write(path, data):
+    return sink_for(os.path.dirname(path)).write(path, data)
+
+
+def move(src, path):
+    return sink_for(os.path.dirname(path)).move(src, path)
+
+
+def start(args=None):
+    """Apply --sink / --fsync-every; call before the first image is saved.
+    Without args every folder is a plain one."""
+    global KIND, FSYNC_EVERY
+    KIND = getattr(args, "sink", None) or "dir"
+    FSYNC_EVERY = getattr(args, "fsync_every", 0) or 0
+    if KIND in ("tar", "zip") and getattr(args, "dedup", None):
+        raise SystemExit("❌ --dedup links files inside the logos folder; use it with --sink dir or sharded")
+    if FSYNC_EVERY and getattr(args, "dedup", None):
+        # the store renames its blobs and links itself; a link made before
+        # its blob's batch is flushed would point at nothing
+        raise SystemExit("❌ --fsync-every doesn't cover --dedup's store; use one or the other")
+    atexit.register(finish)
+
+
+def finish():
+    """Flush pending fsync batches and close archives. Worker processes must
+    call this themselves since they exit without running atexit handlers."""
+    with SINKS_LOCK:
+        sinks = list(SINK_FOLDERS.values())
+        SINK_FOLDERS.clear()
+    for sink in sinks:
+        sink.close()
+
+
+def add_arguments(parser):
+    parser.add_argument(
+        "--sink", choices=SINKS, default="dir",
+        help="write images flat into logos/, into hash-prefix subfolders, or into one .tar/.zip"
+    )
+    parser.add_argument(
+        "--fsync-every", type=int, default=0, metavar="N",
+        help="make saved images durable with one fsync batch per N files (0 = leave it to the OS)"
+    )
@@ -0,0 +1,128 @@
+import os
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import logo_metrics
+import logo_sinks
+from logo_metrics import CACHE
+
+
+# Sidecar kept inside the logos folder: output file name -> where it came from
+SOURCES_FILE = ".sources.json"
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
+}
+
+
+class SourceIndex:
+    """Remembers the source URL and validators (ETag / Last-Modified)
+    of every saved image so a later run can revalidate instead of
+    downloading everything again."""
+
+    def __init__(self, logos_dir):
+        self.logos_dir = logos_dir
+        self.path = os.path.join(logos_dir, SOURCES_FILE)
+        self.lock = threading.Lock()
+        self.entries = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except:
+            pass
+
+    def record(self, final_path, url, headers, content, **row):
+        """`row` (title, domain, stem) says which input row the file belongs
+        to and the name it asked for; a later record without it (refresh)
+        keeps what was there."""
+        entry = {
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "sha1": hashlib.sha1(content).hexdigest(),
+        }
+        name = os.path.basename(final_path)
+        with self.lock:
+            old = self.entries.get(name, {})
+            self.entries[name] = {**entry, **{k: old[k] for k in ("title", "domain", "stem") if k in old}, **row}
+
+    def outputs_by_row(self):
+        """(title, domain) -> file name, for files recorded with their row."""
+        with self.lock:
+            return {
+                (entry.get("title") or "", entry["domain"]): name
+                for name, entry in self.entries.items() if entry.get("domain")
+            }
+
+    def save(self):
+        with self.lock:
+            try:
+                tmp = self.path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(self.entries, f, indent=1)
+                os.replace(tmp, self.path)
+            except:
+                pass
+
+
+def conditional_headers(entry):
+    headers = dict(HEADERS)
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def refresh_one(index, name, entry, encode):
+    path = os.path.join(index.logos_dir, name)
+    try:
+        r = logo_metrics.timed_get(requests, entry["url"], headers=conditional_headers(entry), timeout=20)
+    except:
+        return "failed"
+
+    if r.status_code == 304:
+        return "unchanged"
+    if r.status_code != 200 or not r.content:
+        return "failed"
+    if "text/html" in r.headers.get("Content-Type", ""):
+        return "failed"
+
+    # servers without validators still send the same bytes back
+    if hashlib.sha1(r.content).hexdigest() == entry.get("sha1"):
+        return "unchanged"
+
+    if not encode(r.content, path):
+        return "failed"
+    index.record(path, entry["url"], r.headers, r.content)
+    return "updated"
+
+
+def refresh(logos_dir, encode, workers=8):
+    """Revalidate every recorded output and re-encode only changed images.
+    `encode(content, path)` writes the image and returns True on success."""
+    index = SourceIndex(logos_dir)
+    counts = {"unchanged": 0, "updated": 0, "failed": 0, "missing": 0}
+
+    jobs = []
+    for name, entry in list(index.entries.items()):
+        if not os.path.exists(logo_sinks.target(os.path.join(logos_dir, name))):
+            counts["missing"] += 1
+            continue
+        jobs.append((name, entry))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(lambda job: refresh_one(index, job[0], job[1], encode), jobs)
+        for (name, _), result in zip(jobs, results):
+            counts[result] += 1
+            if result != "failed":
+                CACHE.inc(cache="refresh", result="hit" if result == "unchanged" else "miss")
+            if result == "updated":
+                print(f"🔄 UPDATED: {name}")
+
+    index.save()
+    return counts
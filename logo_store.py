@@ -0,0 +1,160 @@
+"""--dedup: save every logo once, under the hash of its bytes.
+
+Catalogs are full of byte-identical images (one parent company behind many
+products, Google's default globe for every domain it doesn't know). With
+--dedup each encoded image is written once to
+
+    logos/.store/<2 hex>/<sha256>.png
+
+and the per-title file name is a hardlink to it (a symlink where hardlinks
+aren't possible, a plain copy as the last resort). Nothing else changes for
+readers of the logos folder. Files and bytes saved are counted in
+logo_metrics, so shard workers' numbers add up in the parent's summary.
+"""
+import os
+import shutil
+import hashlib
+import threading
+
+import logo_sinks
+from logo_metrics import STORE_FILES, STORE_BYTES
+
+
+STORE_DIR = ".store"
+LINK_MODES = ["hardlink", "symlink", "copy"]
+
+# set by enable(); write() saves plainly while LINK is None
+LINK = None
+# logos folder -> ContentStore; ONLY_STORE, when set, takes every write
+# (shard workers write to a staging folder but share the real folder's store)
+STORES = {}
+STORES_LOCK = threading.Lock()
+ONLY_STORE = None
+
+
+class ContentStore:
+    def __init__(self, logos_dir, link="hardlink"):
+        self.root = os.path.join(logos_dir, STORE_DIR)
+        # tried in order for every file: a hardlink can also fail just
+        # because one blob has hit the filesystem's link limit
+        self.modes = LINK_MODES[LINK_MODES.index(link):]
+        self.lock = threading.Lock()
+        # blobs already on disk, listed once (same idea as output_names)
+        self.blobs = set()
+        for folder, _, files in os.walk(self.root):
+            self.blobs.update(os.path.join(folder, name) for name in files if not name.endswith(".tmp"))
+
+    def blob_path(self, digest, ext):
+        return os.path.join(self.root, digest[:2], digest + ext)
+
+    def put(self, data, ext):
+        """Store `data` unless an identical blob exists; returns its path."""
+        path = self.blob_path(hashlib.sha256(data).hexdigest(), ext)
+        with self.lock:
+            new = path not in self.blobs
+        if new:
+            # two threads may both write the same new blob; the rename makes that harmless
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _replace_with(path, lambda tmp: _write_file(tmp, data))
+            with self.lock:
+                new = path not in self.blobs
+                self.blobs.add(path)
+        if new:
+            STORE_FILES.inc(result="new")
+            STORE_BYTES.inc(len(data), result="new")
+        else:
+            STORE_FILES.inc(result="duplicate")
+            STORE_BYTES.inc(len(data), result="duplicate")
+        return path
+
+    def save(self, data, path):
+        path = logo_sinks.target(path)
+        blob = self.put(data, os.path.splitext(path)[1])
+        if os.path.exists(path) and os.path.samefile(path, blob):
+            return path  # already linked (renaming a link over itself would leave the temp behind)
+        for mode in self.modes:
+            try:
+                if mode == "hardlink":
+                    _replace_with(path, lambda tmp: os.link(blob, tmp))
+                elif mode == "symlink":
+                    # absolute, so the link survives being moved (shard merge)
+                    _replace_with(path, lambda tmp: os.symlink(os.path.abspath(blob), tmp))
+                else:
+                    _replace_with(path, lambda tmp: shutil.copyfile(blob, tmp))
+                return path
+            except (OSError, NotImplementedError):
+                if mode == self.modes[-1]:
+                    raise
+
+
+def _write_file(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _replace_with(path, make):
+    """Create the file at a temp name next to `path`, then rename it over
+    `path`, so an existing name is swapped rather than written through."""
+    tmp = logo_sinks.temp_name(path)
+    try:
+        make(tmp)
+        os.replace(tmp, path)
+    except:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def store_for(folder):
+    if ONLY_STORE is not None:
+        return ONLY_STORE
+    key = os.path.abspath(folder)
+    with STORES_LOCK:
+        if key not in STORES:
+            STORES[key] = ContentStore(folder, LINK)
+        return STORES[key]
+
+
+def write(path, data):
+    """Save `data` at `path`, through the store when --dedup is on and
+    through the --sink otherwise. Returns where the file landed."""
+    if LINK is not None:
+        return store_for(os.path.dirname(path)).save(data, path)
+    # sinks replace names by renaming, so a name left linked by a --dedup
+    # run is swapped out, never written through into the store
+    return logo_sinks.write(path, data)
+
+
+def enable(link="hardlink", logos_dir=None):
+    """Turn on --dedup. Each folder gets its own store unless `logos_dir`
+    is given, in which case its store takes every write."""
+    global LINK, ONLY_STORE
+    LINK = link
+    if logos_dir is not None:
+        ONLY_STORE = ContentStore(logos_dir, link)
+
+
+def dedup_ratio():
+    """Bytes the run asked to save / bytes it actually wrote to the store."""
+    written = STORE_BYTES.value(result="new")
+    total = written + STORE_BYTES.value(result="duplicate")
+    return total / written if written else 1.0
+
+
+def summary():
+    """One summary line, or None when nothing went through the store."""
+    files = STORE_FILES.value()
+    if not files:
+        return None
+    saved = STORE_BYTES.value(result="duplicate")
+    return (f"{files} files → {STORE_FILES.value(result='new')} new images, "
+            f"{dedup_ratio():.2f}x, {saved // 1024} KB not written")
+
+
+def add_arguments(parser):
+    parser.add_argument(
+        "--dedup", nargs="?", const="hardlink", choices=LINK_MODES[:2],
+        help="store identical images once (logos/.store) and link the per-title names to them"
+    )
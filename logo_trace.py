@@ -0,0 +1,249 @@
+"""Per-row trace spans as JSON lines, and an analyzer for them.
+
+    python guaranteed_logo_favicon_downloader_v2.py --csv shop.csv --trace trace.jsonl
+    python logo_trace.py trace.jsonl [--top 20]
+
+Every line is one span: {"row": ..., "step": ..., "kind": ..., "ms": ..., "at": ...}.
+kind "row" is the whole row, "source" a cascade step (html_icon, google, ...)
+and "io" the leaf phases: dns, connect, ttfb, body, parse, decode, encode,
+write. HTTP spans carry the URL, so a slow <link rel=icon> shows up by name.
+ttfb covers request sent to headers received, TLS handshake included.
+"""
+import json
+import time
+import socket
+import argparse
+import threading
+from contextlib import contextmanager
+from collections import defaultdict
+
+
+TRACER = None
+LOCAL = threading.local()
+
+class Tracer:
+    def __init__(self, path):
+        # one write() per line in append mode, so shard processes can share the file
+        self.file = open(path, "a", encoding="utf-8")
+        self.lock = threading.Lock()
+
+    def emit(self, record):
+        line = json.dumps(record, default=str) + "\n"
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+def enable(path):
+    global TRACER
+    if TRACER is None:
+        TRACER = Tracer(path)
+        _install_hooks()
+
+
+def enabled():
+    return TRACER is not None
+
+
+def current_row():
+    return getattr(LOCAL, "row", None)
+
+
+def record(step, seconds, kind="io", row=None, **attrs):
+    if TRACER is None:
+        return
+    row = row or current_row()
+    if row is None:
+        return
+    TRACER.emit({"row": row, "step": step, "kind": kind,
+                 "ms": round(seconds * 1000, 2), "at": round(time.time(), 3), **attrs})
+
+
+def row_key(number, name):
+    """Key of one input row: its CSV row number plus a readable name, so
+    products sharing a domain (or a title) stay separate rows."""
+    return f"{number}:{name}"
+
+
+@contextmanager
+def row(key, **attrs):
+    """Binds `key` to this thread and emits a "row" span when done. Nested
+    calls for a row that is already bound pass straight through. The yielded
+    dict can be filled with attributes (e.g. the source that won)."""
+    if TRACER is None or current_row() is not None:
+        yield attrs
+        return
+
+    LOCAL.row = key
+    start = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        LOCAL.row = None
+        record("row", time.perf_counter() - start, "row", key, **attrs)
+
+
+@contextmanager
+def bind(key):
+    """Attach spans on this thread to `key` without emitting a row span
+    (pipeline stages pick a row up and hand it on)."""
+    previous = current_row()
+    LOCAL.row = key
+    try:
+        yield
+    finally:
+        LOCAL.row = previous
+
+
+@contextmanager
+def span(step, kind="io", **attrs):
+    if TRACER is None or current_row() is None:
+        yield attrs
+        return
+    start = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        record(step, time.perf_counter() - start, kind, **attrs)
+
+
+# ================= HTTP PHASES =================
+def _install_hooks():
+    """Time DNS and TCP connect for traced threads. Threads without a
+    bound row go through untouched."""
+    import urllib3.util.connection as u3
+
+    original_getaddrinfo = socket.getaddrinfo
+    original_connect = u3.create_connection
+
+    def getaddrinfo(*args, **kwargs):
+        if current_row() is None:
+            return original_getaddrinfo(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return original_getaddrinfo(*args, **kwargs)
+        finally:
+            LOCAL.dns = getattr(LOCAL, "dns", 0.0) + time.perf_counter() - start
+
+    def create_connection(*args, **kwargs):
+        if current_row() is None:
+            return original_connect(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return original_connect(*args, **kwargs)
+        finally:
+            LOCAL.connect = getattr(LOCAL, "connect", 0.0) + time.perf_counter() - start
+
+    socket.getaddrinfo = getaddrinfo
+    u3.create_connection = create_connection
+
+
+def traced_get(session, url, **kwargs):
+    """session.get() split into dns / connect / ttfb / body spans."""
+    if TRACER is None or current_row() is None:
+        return session.get(url, **kwargs)
+
+    LOCAL.dns = LOCAL.connect = 0.0
+    start = time.perf_counter()
+    try:
+        r = session.get(url, stream=True, **kwargs)
+        headers_at = time.perf_counter()
+        r.content  # read the body now so it gets its own span
+    except Exception as e:
+        record("ttfb", time.perf_counter() - start, url=url, error=type(e).__name__)
+        raise
+    done = time.perf_counter()
+
+    # getaddrinfo runs inside create_connection
+    dns, connect = LOCAL.dns, LOCAL.connect
+    if connect:
+        record("dns", dns, url=url)
+        record("connect", connect - dns, url=url)
+    record("ttfb", headers_at - start - connect, url=url, status=r.status_code)
+    record("body", done - headers_at, url=url, bytes=len(r.content))
+    return r
+
+
+def add_arguments(parser):
+    parser.add_argument("--trace", help="append per-row trace spans to this JSON lines file")
+
+
+# ================= ANALYZER =================
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def load(paths):
+    spans = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    spans.append(json.loads(line))
+                except ValueError:
+                    continue
+    return spans
+
+
+def breakdown(spans, rows, kind):
+    """Total ms per step over the given rows, largest first."""
+    totals = defaultdict(float)
+    for s in spans:
+        if s["kind"] == kind and s["row"] in rows:
+            totals[s["step"]] += s["ms"]
+    return sorted(totals.items(), key=lambda kv: -kv[1])
+
+
+def analyze(spans, top=10):
+    row_ms = {}
+    for s in spans:
+        if s["kind"] == "row":
+            row_ms[s["row"]] = s["ms"]
+    if not row_ms:
+        print("No row spans found")
+        return
+
+    by_row = defaultdict(list)
+    for s in spans:
+        if s["kind"] != "row":
+            by_row[s["row"]].append(s)
+
+    times = list(row_ms.values())
+    print(f"Rows: {len(times)}   p50 {percentile(times, 50):.0f} ms   "
+          f"p95 {percentile(times, 95):.0f} ms   p99 {percentile(times, 99):.0f} ms")
+
+    print(f"\n🐢 Slowest {top} rows")
+    for key, ms in sorted(row_ms.items(), key=lambda kv: -kv[1])[:top]:
+        slowest = max((s for s in by_row[key] if s["kind"] == "io"), key=lambda s: s["ms"], default=None)
+        detail = ""
+        if slowest:
+            detail = f"  worst: {slowest['step']} {slowest['ms']:.0f} ms {slowest.get('url', '')}"
+        print(f"  {ms:8.0f} ms  {key}{detail}")
+
+    for p in (95, 99):
+        cutoff = percentile(times, p)
+        tail = {key for key, ms in row_ms.items() if ms >= cutoff}
+        tail_total = sum(row_ms[key] for key in tail) or 1
+        print(f"\n📈 Rows at or above p{p} ({cutoff:.0f} ms, {len(tail)} rows)")
+        for kind in ("io", "source"):
+            for step, ms in breakdown(spans, tail, kind)[:5]:
+                print(f"  {kind:6} {step:14} {ms:10.0f} ms  {ms * 100 / tail_total:5.1f}% of row time")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Slowest rows and tail-dominating steps from trace files")
+    parser.add_argument("trace", nargs="+", help="JSON lines written with --trace")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+    analyze(load(args.trace), args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import os
+import time
+import threading
+
+import logo_sinks
+
+
+# Leading bytes of every format the scripts write
+IMAGE_SIGNATURES = [
+    b"\x89PNG", b"\xff\xd8\xff", b"GIF8", b"\x00\x00\x01\x00", b"BM",
+    b"<svg", b"<?xml",
+]
+
+
+# An empty file this old is a claim left by a run that crashed or was
+# killed; younger ones may belong to a run that is still going
+STALE_CLAIM_SECONDS = 3600
+
+
+def looks_like_image(path):
+    """Cheap validity check: the file starts like an image (one small read)."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(32)
+    except OSError:
+        return False
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return True
+    if head[4:8] == b"ftyp":  # AVIF / HEIF
+        return True
+    head = head.lstrip()
+    return any(head.startswith(sig) for sig in IMAGE_SIGNATURES)
+
+
+def is_shard_prefix(name):
+    return len(name) == 2 and all(c in "0123456789abcdef" for c in name)
+
+
+class OutputNames:
+    """Free file names in one output folder, without probing the disk.
+
+    The folder is listed once with os.scandir; after that, names are handed
+    out from memory as `stem.png`, `stem-1.png`, `stem-2.png`, ... with a
+    next-suffix counter per stem, so a title that collides a thousand times
+    costs no more than one that never does. Names are taken when allocated;
+    release() gives back one that was never written.
+
+    Other processes (another run, a shard merge) may write into the same
+    folder after the scan, so an allocated name is also claimed on disk
+    with an exclusive create through the folder's sink; a name someone
+    else got first is skipped like a scanned one. Claims a dead run left
+    behind (empty, older than STALE_CLAIM_SECONDS) are deleted by the scan.
+
+    The same scan keeps (size, mtime, path) of every file, for existing().
+    Files of the sharded layout (logo_sinks) live one level down in
+    two-hex-digit folders and count as if they were in the folder itself.
+    """
+
+    def __init__(self, folder, ext=".png"):
+        self.folder = folder
+        self.ext = ext
+        self.lock = threading.Lock()
+        self.files = {}
+        self.next = {}
+        self._scan(folder, nested=True)
+        self.taken = set(self.files)
+
+    def _scan(self, folder, nested):
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        st = entry.stat()
+                        if st.st_size == 0 and entry.name.endswith(self.ext) and \
+                                time.time() - st.st_mtime > STALE_CLAIM_SECONDS:
+                            try:
+                                os.unlink(entry.path)
+                                continue
+                            except OSError:
+                                pass
+                        self.files[os.path.normcase(entry.name)] = (st.st_size, st.st_mtime, entry.path)
+                    elif nested and entry.is_dir() and is_shard_prefix(entry.name):
+                        self._scan(entry.path, nested=False)
+        except FileNotFoundError:
+            pass
+
+    def allocate(self, stem):
+        sink = logo_sinks.sink_for(self.folder)
+        with self.lock:
+            name = stem + self.ext
+            i = self.next.get(stem, 1)
+            while True:
+                while os.path.normcase(name) in self.taken:
+                    name = f"{stem}-{i}{self.ext}"
+                    i += 1
+                self.taken.add(os.path.normcase(name))
+                if sink.claim(os.path.join(self.folder, name)):
+                    break
+            if name != stem + self.ext:
+                self.next[stem] = i
+            return os.path.join(self.folder, name)
+
+    def release(self, path):
+        """Return a name whose file was never written, so the next row with
+        the same stem gets it (as the old exists() probing would have)."""
+        name = os.path.basename(path)
+        stem = name[:-len(self.ext)]
+        logo_sinks.sink_for(self.folder).unclaim(path)
+        with self.lock:
+            self.taken.discard(os.path.normcase(name))
+            base, _, suffix = stem.rpartition("-")
+            if base and suffix.isdigit() and int(suffix) < self.next.get(base, 1):
+                self.next[base] = int(suffix)
+
+    def existing(self, stem, exts=None):
+        """Path of a non-empty, image-looking file `stem` + one of `exts` that
+        was in the folder when it was scanned, or None."""
+        for ext in exts or [self.ext]:
+            size, _, path = self.files.get(os.path.normcase(stem + ext), (0, 0, None))
+            if size > 0 and looks_like_image(path):
+                return path
+        return None
+
+
+# one registry per folder and process
+REGISTRIES = {}
+REGISTRIES_LOCK = threading.Lock()
+
+
+def for_folder(folder, ext=".png"):
+    key = (os.path.abspath(folder), ext)
+    with REGISTRIES_LOCK:
+        if key not in REGISTRIES:
+            REGISTRIES[key] = OutputNames(folder, ext)
+        return REGISTRIES[key]
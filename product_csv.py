@@ -0,0 +1,34 @@
+import csv
+from collections import namedtuple
+
+
+TITLE = "Title"
+URL = "product.metafields.custom.custom"
+CATEGORY = "Product Category"
+
+# The only Shopify export columns any of the scripts use
+ProductRow = namedtuple("ProductRow", ["title", "url", "category"])
+COLUMNS = (TITLE, URL, CATEGORY)
+
+# Shopify "Body (HTML)" cells can exceed the csv module's 128 KB default
+csv.field_size_limit(2**31 - 1)
+
+
+def read_products(csv_path, defaults=("", "", "")):
+    """Stream ProductRow tuples from a wide Shopify export.
+
+    Only the three used columns are kept (looked up by header index once),
+    so memory stays flat however many columns or rows the file has.
+    Columns missing from the header come back as the matching `defaults`.
+    """
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None) or []
+        header = [h.strip().lstrip("\ufeff") for h in header]
+        indexes = [header.index(c) if c in header else None for c in COLUMNS]
+
+        for record in reader:
+            yield ProductRow(*[
+                default if i is None else (record[i].strip() if i < len(record) else "")
+                for i, default in zip(indexes, defaults)
+            ])
@@ -0,0 +1,121 @@
+import os
+import sys
+import mmap
+import heapq
+import struct
+import hashlib
+import threading
+from array import array
+
+
+SEEN_FILE = ".seen_domains.u64"
+
+# Merge the in-memory delta to disk once it grows past this many entries
+MAX_DELTA = 100_000
+
+ITEM = struct.Struct("<Q")
+
+
+def domain_hash(domain):
+    digest = hashlib.blake2b(domain.lower().encode("utf-8"), digest_size=8).digest()
+    return ITEM.unpack(digest)[0]
+
+
+class SeenDomains:
+    """Set of processed domains stored as a sorted array of 64-bit hashes.
+
+    The on-disk array is memory-mapped and binary searched; new domains go
+    into a small in-memory delta that is merged back on save(). Costs 8 bytes
+    per domain on disk and nothing per domain in RAM beyond the delta.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.delta = set()
+        self.file = None
+        self.map = None
+        self.size = 0
+        self._open()
+
+    def _open(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+        self.file = open(self.path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.size = len(self.map) // ITEM.size
+
+    def _close(self):
+        if self.map:
+            self.map.close()
+            self.file.close()
+        self.file = self.map = None
+        self.size = 0
+
+    def _on_disk(self, h):
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = ITEM.unpack_from(self.map, mid * ITEM.size)[0]
+            if value < h:
+                lo = mid + 1
+            elif value > h:
+                hi = mid
+            else:
+                return True
+        return False
+
+    def __contains__(self, domain):
+        h = domain_hash(domain)
+        with self.lock:
+            return h in self.delta or self._on_disk(h)
+
+    def __len__(self):
+        with self.lock:
+            return self.size + len(self.delta)
+
+    def add(self, domain):
+        h = domain_hash(domain)
+        with self.lock:
+            if h in self.delta or self._on_disk(h):
+                return
+            self.delta.add(h)
+            if len(self.delta) >= MAX_DELTA:
+                self._merge()
+
+    def _existing(self):
+        for i in range(self.size):
+            yield ITEM.unpack_from(self.map, i * ITEM.size)[0]
+
+    def _write(self, out, chunk):
+        if sys.byteorder == "big":
+            chunk.byteswap()
+        out.write(chunk.tobytes())
+
+    def _merge(self):
+        if not self.delta:
+            return
+        tmp = self.path + ".tmp"
+        chunk = array("Q")
+        with open(tmp, "wb") as out:
+            for h in heapq.merge(self._existing(), sorted(self.delta)):
+                chunk.append(h)
+                if len(chunk) >= 65536:
+                    self._write(out, chunk)
+                    chunk = array("Q")
+            self._write(out, chunk)
+
+        # the map has to be closed before the file can be replaced on Windows
+        self._close()
+        os.replace(tmp, self.path)
+        self.delta = set()
+        self._open()
+
+    def save(self):
+        with self.lock:
+            self._merge()
+
+    def close(self):
+        self.save()
+        with self.lock:
+            self._close()
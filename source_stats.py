@@ -0,0 +1,125 @@
+import os
+import json
+import random
+import threading
+
+
+STATE_DIR = os.path.join(os.path.expanduser("~"), ".logo_extractor")
+STATS_FILE = os.path.join(STATE_DIR, "source_stats.json")
+
+# Below this many tries a pattern falls back to the global ("*") stats.
+MIN_TRIES = 20
+
+# Sources that win less often than this (after MIN_TRIES) are skipped,
+# except the last remaining one.
+SKIP_RATE = 0.02
+
+# The order callers pass is the quality order (a site's own logo beats a
+# 16px favicon beats a generic Google globe). Each step down that order
+# divides a source's score by this much, so only a far cheaper and more
+# reliable source can jump ahead of a better-looking one.
+QUALITY_STEP = 4.0
+
+# Share of rows that run the full fixed order, skipped sources included,
+# so their stats keep up with sites that change.
+EXPLORE_RATE = 0.05
+
+# Counts are halved once a source passes this many tries, so old runs fade.
+DECAY_TRIES = 1000
+
+
+def domain_pattern(domain):
+    """Group domains by TLD, e.g. "acme.io" -> "tld:io"."""
+    tld = (domain or "").rsplit(".", 1)[-1].lower()
+    return f"tld:{tld}" if tld else "*"
+
+
+class SourceStats:
+    """Per-source success/latency counts, persisted between runs and used
+    to reorder (or skip) cascade sources per domain pattern."""
+
+    def __init__(self, path=STATS_FILE, frozen=False):
+        self.path = path
+        self.frozen = frozen
+        self.lock = threading.Lock()
+        self.data = {}
+        # counts recorded by this instance only, for merging across processes
+        self.new = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.data = json.load(f)
+        except:
+            pass
+
+    def _entry(self, data, pattern, source):
+        return data.setdefault(pattern, {}).setdefault(
+            source, {"tries": 0, "hits": 0, "seconds": 0.0}
+        )
+
+    def _add(self, pattern, source, tries, hits, seconds):
+        for data in (self.data, self.new):
+            e = self._entry(data, pattern, source)
+            e["tries"] += tries
+            e["hits"] += hits
+            e["seconds"] = round(e["seconds"] + seconds, 3)
+            if data is self.data and e["tries"] > DECAY_TRIES:
+                e["tries"] /= 2
+                e["hits"] /= 2
+                e["seconds"] = round(e["seconds"] / 2, 3)
+
+    def record(self, domain, source, ok, seconds):
+        with self.lock:
+            for pattern in ("*", domain_pattern(domain)):
+                self._add(pattern, source, 1, 1 if ok else 0, seconds)
+
+    def merge(self, new):
+        """Add counts recorded by another instance (see `self.new`)."""
+        with self.lock:
+            for pattern, sources in new.items():
+                for source, e in sources.items():
+                    self._add(pattern, source, e["tries"], e["hits"], e["seconds"])
+
+    def _stats_for(self, domain, source):
+        by_pattern = self.data.get(domain_pattern(domain), {}).get(source)
+        if by_pattern and by_pattern["tries"] >= MIN_TRIES:
+            return by_pattern
+        return self.data.get("*", {}).get(source)
+
+    def order(self, domain, sources):
+        """Return `sources` best-first. `sources` is expected in quality
+        order; it is kept as is when frozen and on exploration rows."""
+        if self.frozen or random.random() < EXPLORE_RATE:
+            return list(sources)
+
+        with self.lock:
+            scored = []
+            skipped = []
+            for i, source in enumerate(sources):
+                s = self._stats_for(domain, source)
+                if not s or s["tries"] == 0:
+                    # no history yet: try it early so it gets some
+                    scored.append((float("inf"), i, source))
+                elif s["tries"] >= MIN_TRIES and s["hits"] / s["tries"] < SKIP_RATE:
+                    skipped.append((s["hits"] / s["tries"], -i, source))
+                else:
+                    # Laplace-smoothed hit rate per second spent on the source,
+                    # weighted down by its place in the quality order
+                    rate = (s["hits"] + 1) / (s["tries"] + 2)
+                    latency = s["seconds"] / s["tries"] + 0.05
+                    scored.append((rate / latency / QUALITY_STEP ** i, i, source))
+
+        if not scored:
+            # everything is below SKIP_RATE: keep the one that wins most
+            return [max(skipped)[2]]
+        return [source for _, _, source in sorted(scored, key=lambda x: (-x[0], x[1]))]
+
+    def save(self):
+        with self.lock:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp = self.path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(self.data, f, indent=2)
+                os.replace(tmp, self.path)
+            except:
+                pass
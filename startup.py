@@ -0,0 +1,18 @@
+import sys
+import time
+
+# Imported first by the entry points, so this is roughly script start
+T0 = time.perf_counter()
+
+# Dependencies the scripts only import at first use
+HEAVY = ["selenium", "webdriver_manager", "bs4", "PIL", "tkinter", "pyarrow"]
+
+
+def elapsed_ms():
+    return (time.perf_counter() - T0) * 1000
+
+
+def report(label):
+    loaded = [m for m in HEAVY if m in sys.modules]
+    print(f"⏱️ {label}: {elapsed_ms():.0f} ms since start "
+          f"(heavy modules loaded: {', '.join(loaded) or 'none'})")